@@ -0,0 +1,129 @@
+import io
+import os
+import threading
+
+GIFS_DIR = os.path.join("assets", "gifs")
+WEBP_DIR = os.path.join(GIFS_DIR, "webp")
+
+# ゲーム画面で使う演出: 名前 → (GIF ファイル名, 表示サイズの上限 (幅, 高さ))
+EFFECTS = {
+    "idle": ("kutiobake.gif", (300, 350)),
+    "angry": ("oikari2.gif", (450, 350)),
+    "threat": ("killyou.gif", (359, 350)),
+    "punch": ("punch.gif", (1920, 1080)),
+}
+# GIF が無い場合に代わりに表示する静止画
+FALLBACKS = {
+    "idle": os.path.join("assets", "images", "kutiobake..jpg"),
+}
+
+_resolved = None
+_resolved_lock = threading.Lock()
+
+
+def _webp_path(gif_name: str) -> str:
+    return os.path.join(WEBP_DIR, os.path.splitext(gif_name)[0] + ".webp")
+
+
+def _keep_gif_marker(gif_name: str) -> str:
+    # WebP にしても小さくならなかった GIF の印（次回の起動で変換し直さないため）
+    return os.path.join(WEBP_DIR, os.path.splitext(gif_name)[0] + ".keep-gif")
+
+
+def _is_newer(path: str, src: str) -> bool:
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(src)
+
+
+def _binary_alpha(value: int) -> int:
+    return 255 if value >= 128 else 0
+
+
+def transcode(src: str, dst: str, max_size, quality: int = 50) -> bool:
+    """
+    アニメーション GIF を、表示サイズに縮小したアニメーション WebP に変換する。
+    変換結果が元の GIF より小さい場合だけ dst に書き出して True を返す（軽くならないなら GIF のまま使う）
+    """
+    from PIL import Image, ImageSequence  # 変換するときだけ読み込む（起動を遅くしないため）
+
+    with Image.open(src) as gif:
+        durations = []
+        frames = []
+        for frame in ImageSequence.Iterator(gif):
+            durations.append(frame.info.get("duration", gif.info.get("duration", 100)))
+            frame = frame.convert("RGBA")
+            frame.thumbnail(max_size, Image.LANCZOS)
+            # 縮小で縁に中間の透明度ができると透明度の圧縮が効かなくなるため、GIF と同じ透明か不透明かに戻す
+            frame.putalpha(frame.getchannel("A").point(_binary_alpha))
+            frames.append(frame)
+    encoded = io.BytesIO()
+    # method=6 や minimize_size は数十秒〜数分かかる割に数 % しか小さくならないため使わない
+    frames[0].save(
+        encoded,
+        "WEBP",
+        save_all=True,
+        append_images=frames[1:],
+        duration=durations,
+        loop=0,
+        quality=quality,
+        method=4,
+    )
+    if encoded.tell() >= os.path.getsize(src):
+        return False
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with open(dst, "wb") as f:
+        f.write(encoded.getvalue())
+    return True
+
+
+def prepare_effects(transcode_missing: bool = True) -> dict:
+    """
+    起動時に呼ぶ。すべての演出ファイルの有無を確認し、
+    変換済みの WebP が無い（または古い）ものは変換してから、演出名 → 画像パス の dict を返す。
+    WebP は元の GIF より小さい場合だけ使う。ファイルが見つからない演出は代替の静止画、それも無ければ None になる。
+    """
+    global _resolved
+    resolved = {}
+    for name, (gif_name, max_size) in EFFECTS.items():
+        gif_path = os.path.join(GIFS_DIR, gif_name)
+        if not os.path.exists(gif_path):
+            fallback = FALLBACKS.get(name)
+            if fallback is not None and not os.path.exists(fallback):
+                fallback = None
+            print(f"演出ファイルが見つかりません: {gif_path}（代替: {fallback}）")
+            resolved[name] = fallback
+            continue
+        webp_path = _webp_path(gif_name)
+        marker = _keep_gif_marker(gif_name)
+        fresh = _is_newer(webp_path, gif_path) and os.path.getsize(webp_path) < os.path.getsize(gif_path)
+        if not fresh and transcode_missing and not _is_newer(marker, gif_path):
+            try:
+                fresh = transcode(gif_path, webp_path, max_size)
+                if fresh and os.path.exists(marker):
+                    os.remove(marker)
+                if not fresh:
+                    print(f"WebP にしても小さくならないため GIF のまま使います: {gif_path}")
+                    if os.path.exists(webp_path):
+                        os.remove(webp_path)
+                    os.makedirs(WEBP_DIR, exist_ok=True)
+                    with open(marker, "w"):
+                        pass
+            except ImportError:
+                pass  # Pillow が無い環境では変換せずに元の GIF を使う
+            except Exception as ex:
+                print(f"演出ファイルの変換に失敗しました: {gif_path}: {ex}")
+        resolved[name] = webp_path if fresh else gif_path
+    resolved = {name: (path.replace("\\", "/") if path else None) for name, path in resolved.items()}
+    with _resolved_lock:
+        _resolved = resolved
+    return resolved
+
+
+def effect_src(name: str):
+    """
+    演出名に対応する画像パスを返す（表示できる画像が無ければ None）
+    """
+    with _resolved_lock:
+        resolved = _resolved
+    if resolved is None:
+        resolved = prepare_effects(transcode_missing=False)
+    return resolved.get(name)
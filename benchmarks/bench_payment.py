@@ -0,0 +1,77 @@
+"""
+select_payment（旧 DP）と payment_solver.solve_payment の速度比較ベンチマーク
+
+使い方（リポジトリのルートで実行）:
+    python benchmarks/bench_payment.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency import DENOMINATIONS  # noqa: E402
+from payment_solver import solve_payment  # noqa: E402
+
+
+def legacy_select_payment(order_sum: int, available: dict) -> int:
+    """
+    main.select_payment の旧実装（比較用にそのまま残している）
+    """
+    total_available = sum(denom * count for denom, count in available.items())
+    max_sum = total_available
+    dp = [False] * (max_sum + 1)
+    dp[0] = True
+    for denom in sorted(available.keys(), reverse=True):
+        quantity = available[denom]
+        for _ in range(quantity):
+            for s in range(max_sum, denom - 1, -1):
+                if dp[s - denom]:
+                    dp[s] = True
+    for s in range(order_sum, max_sum + 1):
+        if dp[s]:
+            return s
+    return order_sum
+
+
+def make_cases(max_count: int, n: int, rng: random.Random) -> list:
+    """
+    各額面 0～max_count 枚の財布と、その合計未満の注文額の組を n 件作る
+    """
+    cases = []
+    while len(cases) < n:
+        available = {d: rng.randint(0, max_count) for d in DENOMINATIONS}
+        total = sum(d * c for d, c in available.items())
+        if total < 2:
+            continue
+        cases.append((rng.randint(1, total - 1), available))
+    return cases
+
+
+def check(cases: list):
+    for order_sum, available in cases:
+        amount, coins = solve_payment(order_sum, available)
+        expected = legacy_select_payment(order_sum, available)
+        assert amount == expected, (order_sum, available, amount, expected)
+        assert sum(d * c for d, c in coins.items()) == amount
+        assert all(c <= available[d] for d, c in coins.items())
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'最大枚数':>8} {'財布の平均額':>12} {'旧DP [ms]':>12} {'新 [ms]':>10} {'速度比':>8}")
+    for max_count in (1, 2, 4, 8):
+        cases = make_cases(max_count, 5, rng)
+        check(cases)
+        mean_total = sum(sum(d * c for d, c in a.items()) for _, a in cases) // len(cases)
+        legacy = timeit.timeit(lambda: [legacy_select_payment(o, a) for o, a in cases], number=1)
+        fast_runs = 20
+        fast = timeit.timeit(lambda: [solve_payment(o, a) for o, a in cases], number=fast_runs) / fast_runs
+        legacy_ms = legacy / len(cases) * 1000
+        fast_ms = fast / len(cases) * 1000
+        print(f"{max_count:>8} {mean_total:>12} {legacy_ms:>12.2f} {fast_ms:>10.4f} {legacy_ms / fast_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+ゲームの処理時間が長くなりやすい関数のベンチマーク一式。
+入力の大きさ（カタログの商品数・財布の枚数・注文の行数・ランキングの件数）を変えて 1 回あたりの時間を測り、
+benchmarks/baseline.json に保存した基準値と比べて、しきい値以上遅くなったものがあれば終了コード 1 で終わる。
+
+使い方（リポジトリのルートで実行）:
+    python benchmarks/bench_suite.py                    # 基準値と比較する
+    python benchmarks/bench_suite.py --update-baseline  # 現在の結果を基準値として保存する
+    python benchmarks/bench_suite.py -k payment         # 名前に payment を含むものだけ実行する
+
+実行する PC の速さの違いは、固定の計算（calibrate）にかかった時間の比で補正してから比較する。
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+from bench_payment import make_cases, legacy_select_payment  # noqa: E402
+from cart import Cart, order_signature  # noqa: E402
+from catalog import get_catalog  # noqa: E402
+from currency import change_breakdown, coin_count  # noqa: E402
+from exchange_calculate import calculate_payment  # noqa: E402
+from game_engine import GameState, RoundState, deal_round, is_orders_matching, select_payment, simulate_payment  # noqa: E402
+from leaderboard import get_rank, get_daily_best  # noqa: E402
+from replay import replay_file  # noqa: E402
+from score import record_ranking, record_score, get_rankings, get_rankings_page  # noqa: E402
+from session_log import SessionRecorder, catalog_fingerprint  # noqa: E402
+import write_queue  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 1.5  # 基準値の何倍を超えたら遅くなったとみなすか
+# 測定のぶれが大きいもの（ディスク書き込みなど）は個別にしきい値を緩める
+THRESHOLDS = {
+    "record_ranking": 3.0,
+    "record_score": 3.0,
+    "write_queue_ranking": 3.0,
+}
+RETRIES = 2  # しきい値を超えたものを測り直す回数
+
+CATALOG_SIZES = (30, 300, 3000)
+WALLET_MAX_COUNTS = (1, 4, 16)
+ORDER_SUMS = (500, 5000, 50000)
+ORDER_LINES = (6, 60, 600)
+RANKING_SIZES = (100, 10000, 100000)
+REPLAY_ROUNDS = (10, 100)
+
+
+def calibrate():
+    """
+    PC の速さの目安にする固定の計算
+    """
+    total = 0
+    for i in range(200000):
+        total += i % 7
+    return total
+
+
+def make_catalog_db(path: str, n_items: int, rng: random.Random):
+    conn = storage.open_connection(path)
+    storage.ensure_schema(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO line_list (name, price, genre, image) VALUES (?, ?, ?, ?)",
+            [(f"商品{i}", rng.randint(50, 1500), storage.GENRES[i % len(storage.GENRES)], f"item{i}.png") for i in range(n_items)],
+        )
+    conn.close()
+
+
+def make_ranking_db(path: str, n_rows: int, rng: random.Random):
+    conn = storage.open_connection(path)
+    storage.ensure_schema(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO ranking (score, timestamp) VALUES (?, ?)",
+            [(rng.randint(0, 300000), "2025-01-01 00:00:00") for _ in range(n_rows)],
+        )
+    conn.close()
+
+
+def make_order(n_lines: int, rng: random.Random) -> list:
+    return [{"name": f"商品{i}", "price": rng.randint(50, 1500), "qty": rng.randint(1, 3)} for i in range(n_lines)]
+
+
+def make_session_recording(path: str, items, n_rounds: int, rng: random.Random):
+    """
+    n_rounds 問分のプレイの記録を作る（注文どおりにカートに入れ、お釣りを最少枚数で払う。1 割はお釣りを間違える）
+    """
+    recorder = SessionRecorder(path, catalog_fingerprint(items))
+    state = GameState()
+    recorder.game_start()
+    for _ in range(n_rounds):
+        seed = rng.getrandbits(63)
+        recorder.round_start(seed)
+        customer_order, payment, _, _ = deal_round(items, seed)
+        current = RoundState(customer_order, payment, state)
+        for item in current.customer_order:
+            for _ in range(item["qty"]):
+                recorder.cart_add(item["id"])
+                current.cart_add(item)
+        change = current.payment - sum(item["price"] * item["qty"] for item in current.customer_order)
+        taps = [denom for denom, n in change_breakdown(change).items() for _ in range(n)]
+        if rng.random() < 0.1:
+            taps.append(10)
+        for denom in taps:
+            recorder.coin_tap(denom)
+            if current.coin_tap(denom):
+                break
+        else:
+            recorder.checkout()
+            current.checkout()
+        recorder.round_end(current.outcome, state.score)
+    recorder.game_over(state.score)
+    recorder.close()
+
+
+def build_benchmarks(workdir: str) -> list:
+    """
+    (名前, 1 回分の処理) のリストを作る。データの準備はここで済ませ、測定には含めない
+    """
+    import main  # flet の読み込みに時間がかかるため、ベンチマークを作るときに import する
+
+    rng = random.Random(0)
+    benchmarks = []
+
+    for max_count in WALLET_MAX_COUNTS:
+        cases = make_cases(max_count, 20, rng)
+        benchmarks.append((f"select_payment[wallet_max={max_count}]",
+                           lambda cases=cases: [select_payment(o, a) for o, a in cases]))
+    # 比較用に旧 DP も測る（小さい財布のみ。大きい財布では 1 回に数秒かかる）
+    cases = make_cases(1, 5, rng)
+    benchmarks.append(("legacy_select_payment[wallet_max=1]",
+                       lambda cases=cases: [legacy_select_payment(o, a) for o, a in cases]))
+
+    for order_sum in ORDER_SUMS:
+        sim_rng = random.Random(1)
+        benchmarks.append((f"simulate_payment[order_sum={order_sum}]",
+                           lambda order_sum=order_sum, sim_rng=sim_rng: simulate_payment(order_sum, sim_rng)))
+
+    def calculate_payments_seeded(bill):
+        # calculate_payment は random モジュールの乱数を使うので、毎回同じ乱数列で測る
+        random.seed(7)
+        return [calculate_payment(bill + k) for k in range(1, 200, 7)]
+
+    for bill in ORDER_SUMS:
+        benchmarks.append((f"calculate_payment[bill={bill}]", lambda bill=bill: calculate_payments_seeded(bill)))
+
+    # お釣りの最少枚数・内訳は表を引くだけなので、金額の大きさによらず一定の時間になるはず
+    for amount in ORDER_SUMS:
+        amounts = [amount + k for k in range(100)]
+        benchmarks.append((f"coin_count[amount={amount}]", lambda amounts=amounts: [coin_count(a) for a in amounts]))
+        benchmarks.append((f"change_breakdown[amount={amount}]",
+                           lambda amounts=amounts: [change_breakdown(a) for a in amounts]))
+
+    for n_items in CATALOG_SIZES:
+        path = os.path.join(workdir, f"catalog_{n_items}.db")
+        make_catalog_db(path, n_items, rng)
+        get_catalog(path).refresh(force=True)
+        benchmarks.append((f"fetch_random_orders[catalog={n_items}]",
+                           lambda path=path: main.fetch_random_orders(path)))
+        catalog = get_catalog(path)
+        cursor = catalog.genre_page(storage.GENRES[0], None, n_items // 16)[1]
+        benchmarks.append((f"catalog_genre_page[catalog={n_items},deep]",
+                           lambda catalog=catalog, cursor=cursor: catalog.genre_page(storage.GENRES[0], cursor, 40)))
+        benchmarks.append((f"catalog_search[catalog={n_items}]",
+                           lambda catalog=catalog: catalog.search("商品12", 100)))
+
+    # 記録したプレイを画面なしで再生する（読み込み・問題の作り直し・判定の合計）
+    items = get_catalog(os.path.join(workdir, f"catalog_{CATALOG_SIZES[0]}.db")).snapshot()
+    for n_rounds in REPLAY_ROUNDS:
+        path = os.path.join(workdir, f"session_{n_rounds}.rec")
+        make_session_recording(path, items, n_rounds, random.Random(2))
+        benchmarks.append((f"replay_session[rounds={n_rounds}]",
+                           lambda path=path: replay_file(path, items)))
+
+    for n_lines in ORDER_LINES:
+        order = make_order(n_lines, rng)
+        processed = [item.copy() for item in reversed(order)]
+        benchmarks.append((f"is_orders_matching[lines={n_lines}]",
+                           lambda order=order, processed=processed: is_orders_matching(order, processed)))
+        # 同じ判定をカートの署名で行う場合（署名は商品の追加・削除のたびに差分で更新済み）
+        for i, item in enumerate(order):
+            item["id"] = i
+        cart = Cart()
+        for item in reversed(order):
+            cart.add(item, item["qty"])
+        signature = order_signature(order)
+        benchmarks.append((f"cart_matches[lines={n_lines}]",
+                           lambda cart=cart, signature=signature: cart.matches(signature)))
+
+    write_path = os.path.join(workdir, "write.db")
+    make_ranking_db(write_path, 0, rng)
+    benchmarks.append(("record_ranking", lambda: record_ranking(12345, write_path)))
+    benchmarks.append(("record_score", lambda: record_score(100, write_path)))
+    # 書き込みキュー経由で 100 件積み、すべてコミットされるまで（グループコミットの効果を見る）
+    queue = write_queue.get_write_queue(write_path)
+
+    def write_queue_burst():
+        futures = [queue.record_ranking(12345) for _ in range(100)]
+        queue.flush()
+        return futures
+
+    benchmarks.append(("write_queue_ranking[writes=100]", write_queue_burst))
+
+    for n_rows in RANKING_SIZES:
+        path = os.path.join(workdir, f"ranking_{n_rows}.db")
+        make_ranking_db(path, n_rows, rng)
+        benchmarks.append((f"get_rankings[rows={n_rows}]", lambda path=path: get_rankings(10, path)))
+        cursor = get_rankings_page(None, n_rows // 2, path)[1]
+        benchmarks.append((f"get_rankings_page[rows={n_rows},deep]",
+                           lambda path=path, cursor=cursor: get_rankings_page(cursor, 50, path)))
+        benchmarks.append((f"leaderboard_rank[rows={n_rows}]", lambda path=path: get_rank(150000, path)))
+        benchmarks.append((f"leaderboard_daily_best[rows={n_rows}]",
+                           lambda path=path: get_daily_best("2025-01-01", path)))
+    return benchmarks
+
+
+def measure(func, repeat: int = 7, min_time: float = 0.05) -> float:
+    """
+    func 1 回あたりの時間 [秒]。min_time 秒以上かかる回数をまとめて repeat 回測り、最小値を使う
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def _limit(name: str, threshold: float) -> float:
+    return THRESHOLDS.get(name.split("[")[0], threshold)
+
+
+def _over_threshold(name: str, elapsed: float, baseline: dict, calibration: float, threshold: float) -> bool:
+    if name not in baseline or "_calibration" not in baseline:
+        return False
+    speed = calibration / baseline["_calibration"]
+    return elapsed > baseline[name] * speed * _limit(name, threshold)
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ゲームの処理時間のベンチマーク（基準値との比較）")
+    parser.add_argument("-k", dest="keyword", default="", help="名前にこの文字列を含むものだけ実行する")
+    parser.add_argument("--update-baseline", action="store_true", help="結果を基準値として保存する")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    calibration = measure(calibrate)
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    results = {}
+    try:
+        benchmarks = [(name, func) for name, func in build_benchmarks(workdir) if args.keyword in name]
+        for name, func in benchmarks:
+            results[name] = measure(func)
+        if not args.update_baseline:
+            # しきい値を超えたものは、一時的な負荷の影響でないことを確かめるため測り直す（速い方を使う）
+            for _ in range(RETRIES):
+                for name, func in benchmarks:
+                    if _over_threshold(name, results[name], baseline, calibration, args.threshold):
+                        results[name] = min(results[name], measure(func))
+    finally:
+        write_queue.close_all()
+        storage.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+    # 速さの目安は最後にもう一度測り、速い方を使う（測定中に他の処理が割り込んだ場合の影響を減らす）
+    calibration = min(calibration, measure(calibrate))
+    # 基準値を測った PC との速さの比（この PC が遅ければ 1 より大きい）
+    speed = calibration / baseline["_calibration"] if "_calibration" in baseline else 1.0
+
+    failures = []
+    print(f"{'ベンチマーク':<44} {'1回 [µs]':>12} {'基準 [µs]':>12} {'比':>7}")
+    for name, elapsed in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<44} {elapsed * 1e6:>12.1f} {'-':>12} {'-':>7}")
+            continue
+        ratio = elapsed / (base * speed)
+        limit = _limit(name, args.threshold)
+        mark = ""
+        if ratio > limit:
+            failures.append(name)
+            mark = f"  ← 遅くなっています（しきい値 {limit}x）"
+        print(f"{name:<44} {elapsed * 1e6:>12.1f} {base * 1e6:>12.1f} {ratio:>6.2f}x{mark}")
+
+    if args.update_baseline:
+        if args.keyword:
+            # -k で一部だけ実行した場合は、既存の基準値を残し、今回の結果を基準値の PC の速さに換算して加える
+            merged = dict(baseline)
+            merged.update({name: value / speed for name, value in results.items()})
+            merged.setdefault("_calibration", calibration)
+        else:
+            merged = dict(results)
+            merged["_calibration"] = calibration
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(merged.items())), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"基準値を保存しました: {args.baseline}")
+    elif failures:
+        print(f"{len(failures)} 件のベンチマークが基準値より遅くなっています: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import json
+import os
+
+from PIL import Image
+
+from animations import prepare_effects
+from thumbnails import MANIFEST_PATH, THUMBS_DIR, THUMBNAIL_SCALE
+
+IMAGES_DIR = os.path.join("assets", "images")
+
+# 画面上の表示サイズ [px]（40: 入力内容の行, 50: 客側の注文内容, 80: カテゴリ一覧）
+DISPLAY_SIZES = [40, 50, 80]
+# 画面が表示するのは THUMBNAIL_SCALE の版だけなので、それ以外の倍率は作らない
+SCALES = [THUMBNAIL_SCALE]
+QUALITY = 80
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def _thumbnail_path(image: str, size: int, scale: int) -> str:
+    stem = os.path.splitext(image)[0]
+    return os.path.join(THUMBS_DIR, str(size), f"{stem}@{scale}x.webp")
+
+
+def _is_up_to_date(src: str, dst: str) -> bool:
+    return os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src)
+
+
+def build_thumbnails(images_dir=IMAGES_DIR, force=False) -> dict:
+    """
+    assets/images の商品画像から、表示サイズごと（SCALES の倍率）の WebP サムネイルを作り、
+    manifest.json（画像名 → サイズ → 倍率 → パス）を書き出す。
+    元画像より新しいサムネイルがあれば作り直さない。
+    """
+    manifest = {}
+    built = 0
+    for image in sorted(os.listdir(images_dir)):
+        if not image.lower().endswith(SOURCE_EXTENSIONS):
+            continue
+        src = os.path.join(images_dir, image)
+        variants = {}
+        with Image.open(src) as original:
+            original.load()
+            has_alpha = original.mode in ("RGBA", "LA") or "transparency" in original.info
+            source = original.convert("RGBA" if has_alpha else "RGB")
+            for size in DISPLAY_SIZES:
+                variants[str(size)] = {}
+                for scale in SCALES:
+                    dst = _thumbnail_path(image, size, scale)
+                    # UI から参照するパスは Flet の src と同じく "/" 区切りで記録する
+                    variants[str(size)][str(scale)] = dst.replace("\\", "/")
+                    if not force and _is_up_to_date(src, dst):
+                        continue
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    thumb = source.copy()
+                    thumb.thumbnail((size * scale, size * scale), Image.LANCZOS)
+                    thumb.save(dst, "WEBP", quality=QUALITY, method=6)
+                    built += 1
+        manifest[image] = variants
+    os.makedirs(THUMBS_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"サムネイルを {built} 枚作成しました（画像 {len(manifest)} 件）。")
+    return manifest
+
+
+if __name__ == "__main__":
+    import sys
+    build_thumbnails(force="--force" in sys.argv)
+    # 演出用アニメーションの軽量版もここで作っておく（起動時の変換を省ける）
+    prepare_effects()
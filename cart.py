@@ -0,0 +1,141 @@
+"""
+レジの入力内容（カート）。商品 id をキーにした dict で行を持ち、
+合計金額・点数と、注文内容の一致判定に使う署名（シグネチャ）を、商品の追加・削除のたびに差分で更新する。
+客の注文との一致判定は、毎回並べ替えて比べる代わりに、署名同士を比べるだけで済む。
+"""
+
+_MASK = (1 << 64) - 1
+
+
+def _mix(value: int) -> int:
+    # splitmix64 の混ぜ込み（商品ごとのハッシュ値がばらけるようにする）
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def line_hash(product_id: int, price: int) -> int:
+    """
+    商品 1 個分のハッシュ値。署名はこれを数量分足し合わせたもの
+    """
+    return _mix(_mix(product_id) ^ price)
+
+
+def order_signature(order) -> tuple:
+    """
+    注文（id・price・qty を持つ dict のリスト）の署名 (ハッシュの和, 合計金額, 点数) を返す。
+    同じ商品・価格・数量の組み合わせなら、並び順によらず同じ値になる。
+    """
+    digest = 0
+    total = 0
+    units = 0
+    for item in order:
+        qty = item.get("qty", 1)
+        digest += line_hash(item["id"], item["price"]) * qty
+        total += item["price"] * qty
+        units += qty
+    return digest & _MASK, total, units
+
+
+class CartLine:
+    """
+    カートの 1 行（商品 1 種類とその数量）
+    """
+
+    __slots__ = ("id", "name", "price", "genre", "image", "qty", "hash")
+
+    def __init__(self, item: dict, qty: int = 1):
+        self.id = item["id"]
+        self.name = item["name"]
+        self.price = item["price"]
+        self.genre = item.get("genre")
+        self.image = item.get("image")
+        self.qty = qty
+        self.hash = line_hash(self.id, self.price)
+
+    @property
+    def subtotal(self) -> int:
+        return self.price * self.qty
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "price": self.price, "genre": self.genre,
+                "image": self.image, "qty": self.qty}
+
+
+class Cart:
+    """
+    入力中の注文。行は商品 id をキーにした dict に追加順で持つ。
+    total（合計金額）・units（点数）・signature（order_signature と同じ形式の署名）は常に最新の値になっている。
+    """
+
+    __slots__ = ("_lines", "total", "units", "_digest")
+
+    def __init__(self):
+        self._lines = {}
+        self.total = 0
+        self.units = 0
+        self._digest = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def get(self, product_id: int):
+        return self._lines.get(product_id)
+
+    def _adjust(self, line: CartLine, delta: int):
+        line.qty += delta
+        self.total += line.price * delta
+        self.units += delta
+        self._digest = (self._digest + line.hash * delta) & _MASK
+
+    def add(self, item: dict, qty: int = 1) -> CartLine:
+        """
+        商品 item を qty 個追加して、その行を返す（既にある商品なら数量を増やす）
+        """
+        line = self._lines.get(item["id"])
+        if line is None:
+            line = CartLine(item, 0)
+            self._lines[line.id] = line
+        self._adjust(line, qty)
+        return line
+
+    def set_qty(self, product_id: int, qty: int) -> CartLine:
+        """
+        行の数量を qty に変更する（1 未満にはしない。行を消すときは remove を使う）
+        """
+        line = self._lines[product_id]
+        self._adjust(line, max(1, qty) - line.qty)
+        return line
+
+    def remove(self, product_id: int) -> CartLine:
+        line = self._lines.pop(product_id)
+        self.total -= line.subtotal
+        self.units -= line.qty
+        self._digest = (self._digest - line.hash * line.qty) & _MASK
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self.total = 0
+        self.units = 0
+        self._digest = 0
+
+    @property
+    def signature(self) -> tuple:
+        return self._digest, self.total, self.units
+
+    def matches(self, signature: tuple) -> bool:
+        """
+        order_signature で求めた客の注文の署名と一致するか（定数時間で判定する）
+        """
+        return self.signature == signature
+
+    def to_orders(self) -> list:
+        """
+        game_engine の判定関数に渡せる dict のリストに変換する
+        """
+        return [line.to_dict() for line in self._lines.values()]
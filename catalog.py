@@ -0,0 +1,177 @@
+import bisect
+import os
+import threading
+
+from storage import DB_PATH, LINE_LIST_FTS, has_search_index, open_connection
+
+FTS_MIN_QUERY = 3  # trigram 索引で検索できる最短の文字数（これより短い語は全商品の部分一致で探す）
+
+
+class Catalog:
+    """
+    line_list テーブルをメモリ上に保持する商品カタログ。
+    起動後は全件リストとジャンル別インデックスから商品を返し、
+    DB が更新されたとき (PRAGMA data_version / ファイルの mtime の変化) だけ再読み込みする。
+    商品名の検索は DB の全文検索索引（line_list_fts）で行い、見つかった id をキャッシュ中の商品に対応させる。
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._mtime = None
+        self._items = ()
+        self._by_id = {}
+        self._by_genre = {}
+        self._genre_ids = {}  # ジャンル → 商品 id の昇順タプル（genre_page の keyset ページング用）
+        self._has_fts = False
+
+    def _connect(self):
+        if self._conn is None:
+            # data_version は「他の接続」のコミットで変わるため、共有接続ではなく専用の接続を持つ
+            # （Flet のイベントハンドラやタイマーは別スレッドから呼ばれるため、ロックで保護して使う）
+            self._conn = open_connection(self.db_path)
+        return self._conn
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _is_stale(self) -> bool:
+        """
+        前回の読み込み以降に DB が変更されていれば True を返す
+        data_version は他の接続によるコミットで変わるため、外部からの更新も検知できる
+        """
+        if self._data_version is None:
+            return True
+        mtime = self._file_mtime()
+        if mtime != self._mtime:
+            return True
+        version = self._connect().execute("PRAGMA data_version").fetchone()[0]
+        return version != self._data_version
+
+    def _load(self):
+        conn = self._connect()
+        # data_version と読み込み内容がずれないよう、同一トランザクション内で取得する
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute(
+                "SELECT id, name, price, genre, image FROM line_list ORDER BY id"
+            ).fetchall()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            conn.execute("COMMIT")
+        items = []
+        by_genre = {}
+        for row in rows:
+            item = {"id": row[0], "name": row[1], "price": row[2], "genre": row[3], "image": row[4]}
+            items.append(item)
+            by_genre.setdefault(item["genre"], []).append(item)
+        self._items = tuple(items)
+        self._by_id = {item["id"]: item for item in items}
+        self._by_genre = {genre: tuple(group) for genre, group in by_genre.items()}
+        self._genre_ids = {genre: tuple(item["id"] for item in group) for genre, group in self._by_genre.items()}
+        self._has_fts = has_search_index(conn)
+        self._data_version = version
+        self._mtime = self._file_mtime()
+
+    def refresh(self, force: bool = False):
+        """
+        DB に変更があった場合のみカタログを読み直す
+        """
+        with self._lock:
+            if force or self._is_stale():
+                self._load()
+
+    def snapshot(self) -> tuple:
+        """
+        キャッシュ中の全商品をそのまま返す（コピーしないため、要素の dict は書き換えないこと）
+        """
+        self.refresh()
+        return self._items
+
+    def all_items(self) -> list:
+        """
+        全商品のリストを返す（各要素は呼び出し側で書き換えられるようコピーを返す）
+        """
+        self.refresh()
+        return [item.copy() for item in self._items]
+
+    def items_by_genre(self, genre: str) -> list:
+        """
+        指定ジャンルの商品リストを返す
+        """
+        self.refresh()
+        return [item.copy() for item in self._by_genre.get(genre, [])]
+
+    def genre_page(self, genre: str, after: int = None, limit: int = 40):
+        """
+        指定ジャンルの商品を id 順に limit 件ずつ返す（keyset ページング）。
+        after には前回返されたカーソル（最初のページは None）を渡す。
+        戻り値は ([商品, ...], 次のページのカーソル)。最後のページではカーソルが None になる。
+        """
+        self.refresh()
+        with self._lock:
+            group = self._by_genre.get(genre, ())
+            ids = self._genre_ids.get(genre, ())
+        start = 0 if after is None else bisect.bisect_right(ids, after)
+        page = group[start:start + limit]
+        next_cursor = page[-1]["id"] if page and start + limit < len(group) else None
+        return [item.copy() for item in page], next_cursor
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """
+        商品名に query を含む商品を返す。
+        FTS_MIN_QUERY 文字以上なら全文検索索引で探し（関連度順）、
+        それより短い語や索引が無い環境では、キャッシュ中の全商品を部分一致で探す（id 順）。
+        """
+        query = query.strip()
+        if not query:
+            return []
+        self.refresh()
+        if self._has_fts and len(query) >= FTS_MIN_QUERY:
+            # 検索語はフレーズとして渡し、FTS5 の構文（AND / * など）として解釈させない
+            phrase = '"' + query.replace('"', '""') + '"'
+            with self._lock:
+                rows = self._connect().execute(
+                    f"SELECT rowid FROM {LINE_LIST_FTS} WHERE {LINE_LIST_FTS} MATCH ? ORDER BY rank LIMIT ?",
+                    (phrase, limit),
+                ).fetchall()
+                by_id = self._by_id
+            return [by_id[row[0]].copy() for row in rows if row[0] in by_id]
+        folded = query.casefold()
+        with self._lock:
+            items = self._items
+        found = []
+        for item in items:
+            if folded in item["name"].casefold():
+                found.append(item.copy())
+                if len(found) >= limit:
+                    break
+        return found
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._data_version = None
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(db_path: str = DB_PATH) -> Catalog:
+    """
+    db_path ごとに共有される Catalog を返す
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.get(db_path)
+        if catalog is None:
+            catalog = Catalog(db_path)
+            _catalogs[db_path] = catalog
+        return catalog
@@ -0,0 +1,107 @@
+"""
+お金（硬貨・紙幣）の額面と、お釣りの内訳・枚数の表。
+日本の額面は大きい額面から払う（貪欲法）のが常に最少枚数になるため、金額 a の内訳は
+「最大の額面 × (a // 最大の額面)」と「a % 最大の額面 の内訳」に分けられる。
+そこで 0 ～ 最大の額面 - 1 円の内訳と枚数だけを最初に使うときに一度作っておき、
+どんな金額（財布の最大額を超える金額も）でも表を 1 回引くだけで求める。
+"""
+import threading
+from array import array
+
+# 硬貨・紙幣（大きい順）。ゲームのルール・お客さんの支払い・お釣りの計算はすべてこれを使う
+DENOMINATIONS = (10000, 5000, 1000, 500, 100, 50, 10, 5, 1)
+
+
+class ChangeTable:
+    """
+    denominations（大きい順）でお釣りを払うときの、最少枚数と内訳の表。
+    内訳は額面ごとの枚数をビットに詰めた 1 つの整数で持つ（1 つ上の額面未満なので、各額面の枚数は数ビットで足りる）
+    """
+
+    def __init__(self, denominations=DENOMINATIONS):
+        self.denominations = tuple(denominations)
+        if self.denominations[-1] != 1:
+            raise ValueError("額面には 1 円を含めてください（どの金額も払えるようにするため）")
+        self.period = self.denominations[0]
+        # 最大の額面以外の各額面の枚数を詰める位置と幅
+        self._fields = []
+        shift = 0
+        for larger, denom in zip(self.denominations, self.denominations[1:]):
+            width = (larger // denom - 1).bit_length()
+            self._fields.append((denom, shift, (1 << width) - 1))
+            shift += width
+        self._counts = array("B", [0]) * self.period
+        self._packed = array("I" if shift <= 32 else "Q", [0]) * self.period
+        # r 円の内訳は「r 以下の最大の額面を 1 枚」+「残りの内訳」（残りは r より小さいので作成済み）
+        ascending = [(denom, shift) for denom, shift, _ in reversed(self._fields)]
+        index = 0
+        for amount in range(1, self.period):
+            while index + 1 < len(ascending) and ascending[index + 1][0] <= amount:
+                index += 1
+            denom, shift = ascending[index]
+            rest = amount - denom
+            self._counts[amount] = self._counts[rest] + 1
+            self._packed[amount] = self._packed[rest] + (1 << shift)
+
+    def coin_count(self, amount: int) -> int:
+        """
+        amount 円を払うのに必要な最少枚数
+        """
+        if 0 <= amount < self.period:
+            return self._counts[amount]
+        quotient, rest = divmod(amount, self.period)
+        return quotient + self._counts[rest]
+
+    def counts(self, amount: int) -> tuple:
+        """
+        amount 円の最少枚数の内訳（denominations と同じ並びの枚数）
+        """
+        quotient, rest = divmod(amount, self.period)
+        packed = self._packed[rest]
+        return (quotient,) + tuple((packed >> shift) & mask for _, shift, mask in self._fields)
+
+    def breakdown(self, amount: int) -> dict:
+        """
+        amount 円の最少枚数の内訳 {額面: 枚数}（枚数が 0 の額面は含めない。大きい額面から順）
+        """
+        return {denom: n for denom, n in zip(self.denominations, self.counts(amount)) if n}
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_change_table(denominations=DENOMINATIONS) -> ChangeTable:
+    """
+    額面の組み合わせごとに共有される ChangeTable を返す（最初に使うときに作る）
+    """
+    key = tuple(denominations)
+    table = _tables.get(key)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(key)
+            if table is None:
+                table = ChangeTable(key)
+                _tables[key] = table
+    return table
+
+
+def coin_count(amount: int) -> int:
+    """
+    amount 円のお釣りを最少枚数で払ったときの硬貨・紙幣の枚数
+    """
+    return (_tables.get(DENOMINATIONS) or get_change_table()).coin_count(amount)
+
+
+def change_breakdown(amount: int) -> dict:
+    """
+    amount 円のお釣りの最少枚数の内訳 {額面: 枚数}
+    """
+    return get_change_table().breakdown(amount)
+
+
+def format_breakdown(breakdown: dict) -> str:
+    """
+    内訳を「1000円×2、100円×3」の形の文字列にする（内訳が空なら「なし」）
+    """
+    return "、".join(f"{denom}円×{n}" for denom, n in breakdown.items()) or "なし"
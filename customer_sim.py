@@ -0,0 +1,75 @@
+"""
+お客さんの財布と支払額をまとめて生成するバッチ API（難易度調整・分析用）
+main.simulate_payment を N 人分、NumPy 配列で一度に行う。
+"""
+import numpy as np
+
+import currency
+from payment_solver import min_payment
+
+DENOMINATIONS = np.array(currency.DENOMINATIONS, dtype=np.int64)
+
+
+def generate_wallets(order_sums, rng=None, max_count: int = 4) -> np.ndarray:
+    """
+    order_sums: 各お客さんの注文合計（長さ N の配列）
+    各額面の所持枚数を 0～max_count の乱数で決めた (N, 9) の配列を返す。
+    列の並びは DENOMINATIONS と同じ。
+    合計が注文額以下の財布は、足りない分 + 1 円を 1 円硬貨でまとめて補う
+    （simulate_payment の while ループと同じ結果を一度の計算で求める）。
+    """
+    rng = np.random.default_rng(rng)
+    order_sums = np.asarray(order_sums, dtype=np.int64)
+    counts = rng.integers(0, max_count + 1, size=(order_sums.shape[0], DENOMINATIONS.shape[0]), dtype=np.int64)
+    totals = counts @ DENOMINATIONS
+    counts[:, -1] += np.maximum(order_sums - totals + 1, 0)
+    return counts
+
+
+def wallet_totals(wallets: np.ndarray) -> np.ndarray:
+    """
+    (N, 9) の財布配列から各財布の合計金額を返す
+    """
+    return np.asarray(wallets, dtype=np.int64) @ DENOMINATIONS
+
+
+def payments_for_wallets(order_sums, wallets: np.ndarray) -> np.ndarray:
+    """
+    各財布で order_sum 以上を支払える最小額を返す（長さ N の配列）。
+    同じ (注文額, 財布) の組はまとめて 1 回だけ計算する。
+    """
+    order_sums = np.asarray(order_sums, dtype=np.int64)
+    wallets = np.asarray(wallets, dtype=np.int64)
+    keys = np.column_stack([order_sums, wallets])
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    denoms = DENOMINATIONS.tolist()
+    unique_payments = np.fromiter(
+        (min_payment(int(row[0]), dict(zip(denoms, row[1:].tolist()))) for row in unique_keys),
+        dtype=np.int64,
+        count=unique_keys.shape[0],
+    )
+    return unique_payments[inverse.reshape(-1)]
+
+
+def simulate_payments(order_sums, rng=None, max_count: int = 4):
+    """
+    N 人分の財布を生成し、(支払額の配列, 財布の配列) を返す。
+    rng には np.random.Generator またはシード値を渡せる（再現性のある生成が可能）。
+    """
+    wallets = generate_wallets(order_sums, rng, max_count)
+    payments = payments_for_wallets(order_sums, wallets)
+    return payments, wallets
+
+
+# 動作確認用のメインコード
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    order_sums = rng.integers(100, 6 * 5080, size=n)
+    start = time.perf_counter()
+    payments, wallets = simulate_payments(order_sums, rng)
+    elapsed = time.perf_counter() - start
+    change = payments - order_sums
+    print(f"{n} 人分: {elapsed:.2f} 秒, お釣りの平均 {change.mean():.1f} 円, 最大 {change.max()} 円")
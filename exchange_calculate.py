@@ -1,11 +1,30 @@
 import math
 import random
 
-def calculate_payment(bill_amount: int, error_rate: float = 0.3, max_payment: int = None) -> int:
+import numpy as np
+
+from currency import coin_count  # お釣りの最少枚数（currency の表を引く）
+
+# 候補の支払額とのお釣りは 10000 円未満 (10000円札の候補) か 100 円未満 (丸め・加算の候補) に収まる
+MAX_CHANGE = 10000
+_change_coin_counts_array = None
+
+
+def _change_coin_counts() -> np.ndarray:
+    """
+    お釣り 0～MAX_CHANGE 円の枚数表（calculate_payments で配列のまま引くため、最初に使うときに一度だけ作る）
+    """
+    global _change_coin_counts_array
+    if _change_coin_counts_array is None:
+        _change_coin_counts_array = np.array([coin_count(amount) for amount in range(MAX_CHANGE + 1)], dtype=np.int64)
+    return _change_coin_counts_array
+
+def calculate_payment(bill_amount: int, error_rate: float = 0.3, max_payment: int = None, rng=random) -> int:
     """
     bill_amount に対して、実際の支払い額をシミュレートする。
     error_rate の確率で bill_amount ピッタリの支払いを除外し、候補の中から選択する。
     max_payment が指定されている場合、支払い額は max_payment 以下に限定する。
+    rng には random.Random(seed) を渡せる（省略時は random モジュールの乱数。同じ種なら同じ結果になる）。
     """
     candidates = set()
     # (1) ピッタリ支払う
@@ -47,34 +66,80 @@ def calculate_payment(bill_amount: int, error_rate: float = 0.3, max_payment: in
             valid_candidates = [bill_amount]
     
     # 一定の確率 error_rate でピッタリ支払いを除外する
-    if bill_amount in valid_candidates and random.random() < error_rate:
+    if bill_amount in valid_candidates and rng.random() < error_rate:
         valid_candidates = [amt for amt in valid_candidates if amt != bill_amount]
         if not valid_candidates:
             valid_candidates = [bill_amount]
     
-    # お釣りとなる硬貨・紙幣の枚数を求めるヘルパー関数
-    def coin_count(amount: int) -> int:
-        denominations = [10000, 5000, 1000, 500, 100, 50, 10, 5, 1]
-        count = 0
-        remaining = amount
-        for d in denominations:
-            count += remaining // d
-            remaining %= d
-        return count
-    
-    # 候補のスコアは (支払額 - bill_amount) のお釣り枚数で評価
-    def score(amount: int) -> int:
-        change = amount - bill_amount
-        return coin_count(change)
-    
+    # 候補のスコアは (支払額 - bill_amount) のお釣り枚数で評価（currency の表を引くだけ）
+    scores = {amt: coin_count(amt - bill_amount) for amt in valid_candidates}
+
     # コイン枚数(score)と余分な金額の小さい順にソートする
-    valid_candidates.sort(key=lambda x: (score(x), x - bill_amount))
-    best_score = score(valid_candidates[0])
-    best_candidates = [amt for amt in valid_candidates if score(amt) == best_score]
+    valid_candidates.sort(key=lambda x: (scores[x], x - bill_amount))
+    best_score = scores[valid_candidates[0]]
+    best_candidates = [amt for amt in valid_candidates if scores[amt] == best_score]
     
-    chosen = random.choice(best_candidates)
+    chosen = rng.choice(best_candidates)
     return chosen
 
+def calculate_payments(bills, error_rate=0.3, max_payments=None, rng=None) -> np.ndarray:
+    """
+    calculate_payment の配列版。bills（請求額の配列）の各要素について支払額をシミュレートし、
+    同じ長さの配列で返す。各請求額に対する支払額の分布は calculate_payment と同じ。
+    error_rate / max_payments にはスカラーか bills と同じ長さの配列を渡せる。
+    rng には np.random.Generator またはシード値を渡す（同じシードなら同じ結果になる）。
+    """
+    rng = np.random.default_rng(rng)
+    bills = np.asarray(bills, dtype=np.int64)
+    n = bills.shape[0]
+    b = bills[:, None]
+
+    # 候補の支払額を (N, 12) の表にする。条件を満たさない候補は bill 自身で埋め、後で重複として除く
+    mod5, mod10, mod100 = bills % 5, bills % 10, bills % 100
+    candidates = np.column_stack([
+        bills,
+        np.where(mod10 != 0, (bills + 9) // 10 * 10, bills),
+        np.where(mod10 != 0, bills // 10 * 10, bills),
+        np.where(mod5 != 0, bills + (5 - mod5), bills),
+        np.where(mod5 != 0, bills - mod5, bills),
+        np.where(mod100 != 0, (bills + 99) // 100 * 100, bills),
+        np.where(mod100 != 0, bills // 100 * 100, bills),
+        np.where(bills < 1000, 1000, bills),
+        np.where(bills < 10000, 10000, bills),
+        bills + 5,
+        bills + 10,
+        bills + 100,
+    ])
+    # set と同じく重複を除くため、行ごとに並べて直前と同じ値を無効にする
+    candidates.sort(axis=1)
+    valid = candidates >= b
+    valid[:, 1:] &= candidates[:, 1:] != candidates[:, :-1]
+    exact = candidates == b
+
+    if max_payments is not None:
+        max_payments = np.broadcast_to(np.asarray(max_payments, dtype=np.int64), (n,))
+        valid &= candidates <= max_payments[:, None]
+        # 候補が残らなければ bill_amount ピッタリだけを候補にする
+        empty = ~valid.any(axis=1)
+        valid[empty] = exact[empty]
+        valid[empty] &= np.cumsum(exact[empty], axis=1) == 1
+
+    # 一定の確率 error_rate でピッタリ支払いを除外する（他に候補が無ければ戻す）
+    error_rate = np.broadcast_to(np.asarray(error_rate, dtype=np.float64), (n,))
+    drop = rng.random(n) < error_rate
+    exact_valid = valid & exact
+    without_exact = valid & ~exact
+    keep_exact = ~drop[:, None] | ~without_exact.any(axis=1)[:, None]
+    valid = without_exact | (exact_valid & keep_exact)
+
+    # お釣り枚数が最小の候補の中から一様に 1 つ選ぶ
+    change = np.where(valid, candidates - b, 0)
+    scores = np.where(valid, _change_coin_counts()[change], np.iinfo(np.int64).max)
+    best = valid & (scores == scores.min(axis=1, keepdims=True))
+    pick = (rng.random(n) * best.sum(axis=1)).astype(np.int64)
+    chosen = (np.cumsum(best, axis=1) > pick[:, None]).argmax(axis=1)
+    return candidates[np.arange(n), chosen]
+
 # テスト用のメインコード
 if __name__ == "__main__":
     bill = 862
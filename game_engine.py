@@ -0,0 +1,261 @@
+"""
+ゲームのルール（注文の生成・お客さんの支払い・会計の判定・得点とライフ）をまとめたモジュール。
+画面（flet）には依存しないため、main.py からも、simulate.py の高速シミュレーションからも同じルールを使う。
+乱数は rng 引数で受け取る（random.Random(seed) を渡せば結果が再現できる。省略時は random モジュール）。
+"""
+import random
+
+from cart import Cart, order_signature
+from currency import DENOMINATIONS, get_change_table  # お客さんの財布に入っている硬貨・紙幣（大きい順）
+from payment_solver import solve_payment
+
+MAX_ORDER_ITEMS = 6  # 1 回の注文で選ぶ商品の数（重複あり）の上限
+WALLET_MAX_COUNT = 4  # 財布に入っている各額面の枚数の上限
+INITIAL_LIVES = 3
+ANGRY_COIN_LIMIT = 23  # お釣りの枚数がこれを超えるとお客さんが怒る
+ROUND_SECONDS = 60  # 1 問の制限時間
+
+# 1 問ごとの結果
+CORRECT = "correct"
+ORDER_MISTAKE = "order_mistake"  # 入力した注文が客の注文と違う
+CHANGE_MISTAKE = "change_mistake"  # お釣りの金額が違う
+TIMEOUT = "timeout"  # 制限時間切れ
+TOO_MANY_COINS = "too_many_coins"  # お釣りの枚数が多すぎて客が怒った
+OUTCOMES = (CORRECT, ORDER_MISTAKE, CHANGE_MISTAKE, TIMEOUT, TOO_MANY_COINS)
+
+# お釣りの枚数の評価（最少枚数より何枚多いかの上限と評価。上から順に当てはめ、None はそれ以外すべて）
+EFFICIENCY_GRADES = ((0, "◎ 最少枚数"), (2, "○ あと少し"), (None, "△ 枚数が多い"))
+
+
+def generate_order(items, rng=random) -> list:
+    """
+    商品一覧 items（カタログの dict のリスト）からランダムに 1～MAX_ORDER_ITEMS 個選び（重複あり）、
+    同じ商品は qty にまとめた注文を返す。items の dict は書き換えず、選ばれた分だけコピーする。
+    """
+    n = rng.randint(1, MAX_ORDER_ITEMS)
+    combined = {}
+    for item in rng.choices(items, k=n):
+        key = item["name"]
+        if key in combined:
+            combined[key]["qty"] += 1
+        else:
+            order = item.copy()
+            order["qty"] = 1
+            combined[key] = order
+    return list(combined.values())
+
+
+def order_total(order) -> int:
+    """
+    注文（qty 付きの商品 dict のリスト）の合計金額
+    """
+    return sum(item["price"] * item.get("qty", 1) for item in order)
+
+
+def is_orders_matching(customer_order, processed_orders) -> bool:
+    """
+    客の注文と入力した注文が、商品・価格・数量まですべて一致しているか判定する
+    """
+    if len(customer_order) != len(processed_orders):
+        return False
+    sorted_customer = sorted(customer_order, key=lambda x: x["name"])
+    sorted_processed = sorted(processed_orders, key=lambda x: x["name"])
+    for cust, proc in zip(sorted_customer, sorted_processed):
+        if cust["name"] != proc["name"]:
+            return False
+        if cust["price"] != proc["price"]:
+            return False
+        if cust.get("qty", 1) != proc.get("qty", 1):
+            return False
+    return True
+
+
+def generate_wallet(order_sum: int, rng=random) -> dict:
+    """
+    お客さんの財布（{額面: 枚数}）をランダムに作る（各額面 0～WALLET_MAX_COUNT 枚）。
+    合計が order_sum 以下の場合は、足りない分 + 1 円を 1 円硬貨でまとめて足す。
+    """
+    available = {d: rng.randint(0, WALLET_MAX_COUNT) for d in DENOMINATIONS}
+    total_available = sum(d * cnt for d, cnt in available.items())
+    if total_available <= order_sum:
+        available[1] += order_sum - total_available + 1
+    return available
+
+
+def select_payment(order_sum: int, available: dict) -> int:
+    """
+    available: {コイン額面: 個数, ...}
+    order_sum 以上の支払額で、可能な組み合わせの中から最小額を返す。
+    支払いに使うコインの内訳も必要な場合は payment_solver.solve_payment を使う。
+    """
+    payment, _ = solve_payment(order_sum, available)
+    return payment
+
+
+def simulate_payment(order_sum: int, rng=random):
+    """
+    お客さんの財布をランダムに作り、その中からお釣り（支払額 - order_sum）が最小になる支払い方を選ぶ。
+    (支払額, 財布, 支払ったコインの内訳) を返す。
+    """
+    available = generate_wallet(order_sum, rng)
+    payment, paid_coins = solve_payment(order_sum, available)
+    return payment, available, paid_coins
+
+
+def new_round_seed() -> int:
+    """
+    1 問分の乱数の種（記録しておけば deal_round で同じ問題を作り直せる）
+    """
+    return random.getrandbits(63)
+
+
+def deal_round(items, seed: int) -> tuple:
+    """
+    種 seed から 1 問分の (客の注文, 支払額, 財布, 支払ったコインの内訳) を作る。
+    同じ商品一覧と seed からは必ず同じ問題になる（ゲーム画面もリプレイもこの関数で問題を作る）
+    """
+    rng = random.Random(seed)
+    customer_order = generate_order(items, rng)
+    payment, available, paid_coins = simulate_payment(order_total(customer_order), rng)
+    return customer_order, payment, available, paid_coins
+
+
+def grade_round(customer_order, processed_orders, numeric_input: int, payment: int) -> tuple:
+    """
+    会計ボタンを押したときの判定。(結果, 正しいお釣り) を返す。
+    注文の不一致を先に判定し、注文が合っていればお釣りの金額を判定する。
+    """
+    correct_change = payment - order_total(customer_order)
+    if not is_orders_matching(customer_order, processed_orders):
+        return ORDER_MISTAKE, correct_change
+    if numeric_input != correct_change:
+        return CHANGE_MISTAKE, correct_change
+    return CORRECT, correct_change
+
+
+def grade_efficiency(change: int, coins_used: int, denominations=DENOMINATIONS) -> tuple:
+    """
+    お釣り change 円を coins_used 枚で渡したときの枚数の評価。(評価, 最少枚数) を返す。
+    denominations にはお釣りに使える額面（大きい順）を渡す（最少枚数は currency の表を引くだけで求まる）
+    """
+    optimal = get_change_table(denominations).coin_count(change)
+    extra = coins_used - optimal
+    for limit, grade in EFFICIENCY_GRADES:
+        if limit is None or extra <= limit:
+            return grade, optimal
+
+
+def round_points(outcome: str, processed_orders) -> int:
+    """
+    1 問の得点。正解のときだけ、入力した注文の合計金額が得点になる
+    """
+    if outcome != CORRECT:
+        return 0
+    return order_total(processed_orders)
+
+
+class GameState:
+    """
+    1 ゲーム分の得点・残りライフ・解いた問題数
+    """
+
+    __slots__ = ("score", "lives", "rounds")
+
+    def __init__(self, lives: int = INITIAL_LIVES):
+        self.score = 0
+        self.lives = lives
+        self.rounds = 0
+
+    def apply(self, outcome: str, points: int = 0):
+        """
+        1 問の結果を反映する（正解なら得点を加算し、それ以外はライフを 1 減らす）
+        """
+        self.rounds += 1
+        if outcome == CORRECT:
+            self.score += points
+        else:
+            self.lives -= 1
+
+    @property
+    def over(self) -> bool:
+        return self.lives <= 0
+
+
+class RoundState:
+    """
+    1 問分の入力（カート・お釣り置き場のコイン）と回答の状態。
+    ゲーム画面のハンドラ（main.build_game_screen）はこのメソッドで状態を変え、画面の更新・音・演出だけを自分で行う。
+    replay.py も同じメソッドで記録を再生するので、判定のルールは画面と再生で常に同じになる。
+    問題を終わらせた操作では結果（OUTCOMES のいずれか）を返して state に反映し、それ以外は None を返す
+    """
+
+    def __init__(self, customer_order, payment: int, state: GameState):
+        self.customer_order = customer_order
+        self.payment = payment
+        self.target_signature = order_signature(customer_order)
+        self.state = state
+        self.cart = Cart()  # 入力した注文
+        self.numeric_input = 0  # 入力したお釣りの金額
+        self.coins = 0  # お釣り置き場のコインの枚数
+        self.answered = False  # この問題で既に回答済みか
+        self.angry = False  # お釣りの枚数が多すぎて客が怒ったか
+        self.outcome = None
+        self.correct_change = None
+
+    def _finish(self, outcome: str, points: int = 0) -> str:
+        self.answered = True
+        self.outcome = outcome
+        self.state.apply(outcome, points)
+        return outcome
+
+    @property
+    def matching(self) -> bool:
+        """
+        入力した注文が客の注文と一致しているか（支払情報を表示する条件）
+        """
+        return self.cart.matches(self.target_signature)
+
+    def coin_tap(self, value: int):
+        if self.answered:
+            return None  # 回答済み（結果の演出中）のタップは数えない
+        self.numeric_input += value
+        self.coins += 1
+        # お釣りが ANGRY_COIN_LIMIT 枚を超えた時点でこの問題は終了
+        if not self.angry and self.coins > ANGRY_COIN_LIMIT:
+            self.angry = True
+            return self._finish(TOO_MANY_COINS)
+        return None
+
+    def cart_add(self, item: dict):
+        return self.cart.add(item)
+
+    def cart_qty(self, product_id: int, delta: int) -> bool:
+        """
+        数量を delta だけ変える。変わらなかった（下限・上限に達している）場合は False
+        """
+        qty = self.cart.get(product_id).qty
+        return self.cart.set_qty(product_id, qty + delta).qty != qty
+
+    def cart_delete(self, product_id: int):
+        return self.cart.remove(product_id)
+
+    def clear_coins(self):
+        self.numeric_input = 0
+        self.coins = 0
+
+    def zero_change(self):
+        # 金額だけを 0 にする（置き場のコインはそのまま）
+        self.numeric_input = 0
+
+    def checkout(self):
+        if self.answered:
+            return None
+        processed_orders = self.cart.to_orders()
+        outcome, self.correct_change = grade_round(
+            self.customer_order, processed_orders, self.numeric_input, self.payment)
+        return self._finish(outcome, round_points(outcome, processed_orders))
+
+    def timeout(self):
+        if self.answered:
+            return None
+        return self._finish(TIMEOUT)
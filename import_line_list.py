@@ -1,20 +1,117 @@
+import argparse
 import csv
-import sqlite3
-
-def import_csv_to_db(csv_path="line_list.csv", db_path="flet_app.db"):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    with open(csv_path, encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            # CSVの各カラムは "name", "price", "genre", "image" であることを前提とする
-            cursor.execute("""
-            INSERT INTO line_list (name, price, genre, image)
-            VALUES (?, ?, ?, ?)
-            """, (row['name'], int(row['price']), row['genre'], row['image']))
-    conn.commit()
-    conn.close()
-    print("CSVからDBへのインポートが完了しました。")
-    
+import itertools
+
+from storage import DB_PATH, GENRES, transaction
+
+CHUNK_SIZE = 5000  # 1 回の executemany に渡す行数
+
+# 商品名をキーにした upsert。内容が変わっていない行は更新しない（WHERE が偽なら何も書き込まれない）
+UPSERT_SQL = """
+    INSERT INTO line_list (name, price, genre, image)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET
+        price = excluded.price,
+        genre = excluded.genre,
+        image = excluded.image
+    WHERE line_list.price IS NOT excluded.price
+       OR line_list.genre IS NOT excluded.genre
+       OR line_list.image IS NOT excluded.image
+"""
+
+
+def _parse_rows(reader, skipped: list):
+    """
+    CSV の行を (name, price, genre, image) に変換する。取り込めない行は skipped に (行番号, 理由, 商品名) を追加して飛ばす
+    """
+    for row in reader:
+        # CSVの各カラムは "name", "price", "genre", "image" であることを前提とする
+        line_no = reader.line_num
+        name = (row.get("name") or "").strip()
+        if not name:
+            skipped.append((line_no, "name が空です", None))
+            continue
+        try:
+            price = int(row["price"])
+        except (TypeError, ValueError):
+            skipped.append((line_no, f"price が整数ではありません: {row.get('price')!r}", name))
+            continue
+        genre = row.get("genre")
+        if genre not in GENRES:
+            skipped.append((line_no, f"genre が不正です: {genre!r}", name))
+            continue
+        yield name, price, genre, row.get("image") or None
+
+
+def _print_progress(rows_done: int):
+    print(f"  {rows_done} 行を処理しました")
+
+
+def import_csv_to_db(csv_path="line_list.csv", db_path=DB_PATH, prune: bool = False,
+                     chunk_size: int = CHUNK_SIZE, progress=_print_progress) -> dict:
+    """
+    CSV の商品一覧を line_list に取り込む。商品名をキーに upsert するので、何度実行しても商品は重複しない。
+    CSV は chunk_size 行ずつ読み込んで executemany で書き込み、全体を 1 トランザクションで行う（途中で失敗したら何も変わらない）。
+    価格・ジャンル・画像が変わった商品だけを更新し、prune=True なら CSV に無い商品を削除する（取り込めずに飛ばした行の商品は削除しない）。
+    progress には chunk ごとに処理済みの行数が渡される（None で表示しない）。
+    戻り値は件数の内訳 {"rows", "inserted", "updated", "unchanged", "deleted", "skipped"}。
+    """
+    skipped = []
+    rows = 0
+    changed = 0
+    deleted = 0
+    with open(csv_path, encoding="utf-8", newline="") as csvfile, transaction(db_path) as conn:
+        before = conn.execute("SELECT COUNT(*) FROM line_list").fetchone()[0]
+        if prune:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_names (name TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.import_names")
+        parsed = _parse_rows(csv.DictReader(csvfile), skipped)
+        while True:
+            chunk = list(itertools.islice(parsed, chunk_size))
+            if not chunk:
+                break
+            # rowcount は各文が直接書き換えた行数の合計（total_changes と違い、検索索引などのトリガーの分を含まない）
+            changed += conn.executemany(UPSERT_SQL, chunk).rowcount
+            if prune:
+                conn.executemany("INSERT OR IGNORE INTO temp.import_names (name) VALUES (?)",
+                                 [(row[0],) for row in chunk])
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows)
+        if prune:
+            # 価格の書き間違いなどで飛ばした行の商品は CSV に載っているので、削除しない（既存の内容のまま残す）
+            conn.executemany("INSERT OR IGNORE INTO temp.import_names (name) VALUES (?)",
+                             [(name,) for _, _, name in skipped if name])
+            deleted = conn.execute(
+                "DELETE FROM line_list WHERE name NOT IN (SELECT name FROM temp.import_names)"
+            ).rowcount
+            conn.execute("DROP TABLE temp.import_names")
+        after = conn.execute("SELECT COUNT(*) FROM line_list").fetchone()[0]
+
+    inserted = after - before + deleted
+    stats = {
+        "rows": rows,
+        "inserted": inserted,
+        "updated": changed - inserted,
+        # CSV 内で同じ商品が複数回出てきた場合は、2 回目以降も「更新」か「変更なし」として数える
+        "unchanged": rows - changed,
+        "deleted": deleted,
+        "skipped": len(skipped),
+    }
+    for line_no, reason, _ in skipped:
+        print(f"{csv_path}:{line_no}: 取り込めない行を飛ばしました（{reason}）")
+    print(f"CSVからDBへのインポートが完了しました。追加 {stats['inserted']} 件、更新 {stats['updated']} 件、"
+          f"変更なし {stats['unchanged']} 件、削除 {stats['deleted']} 件、スキップ {stats['skipped']} 件")
+    return stats
+
+
 if __name__ == "__main__":
-    import_csv_to_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="商品一覧の CSV を DB に取り込む（何度実行しても重複しない）")
+    parser.add_argument("csv_path", nargs="?", default="line_list.csv")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--prune", action="store_true", help="CSV に無い商品を DB から削除する")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--quiet", action="store_true", help="途中経過を表示しない")
+    args = parser.parse_args()
+    import_csv_to_db(args.csv_path, args.db, prune=args.prune, chunk_size=args.chunk_size,
+                     progress=None if args.quiet else _print_progress)
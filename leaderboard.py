@@ -0,0 +1,82 @@
+"""
+ランキングの集計（今日・今週の最高点、得点の分布、ある得点が何位か）。
+集計表は ranking への記録のたびにトリガーで更新される（storage.LEADERBOARD_SCHEMA）ので、
+ここでは集計表と索引を読むだけで、ranking 全体を並べ替えたり数え上げたりしない。
+"""
+import datetime
+
+from storage import DB_PATH, HISTOGRAM_WIDTH, LEADERBOARD_TABLE, rebuild_leaderboard, transaction
+
+
+def score_bucket(score: int) -> int:
+    return score // HISTOGRAM_WIDTH
+
+
+def get_rank(score: int, db_path: str = DB_PATH) -> tuple:
+    """
+    score が全記録の中で何位か。戻り値は (順位, 記録の件数)。同点は同じ順位（自分より高い得点の件数 + 1）。
+    自分より上の区間の件数は分布から、同じ区間の中で自分より高い件数は score の索引の範囲で数えるので、
+    記録が何件あっても、読むのは分布の表と 1 区間分の索引だけで済む。
+    """
+    bucket = score_bucket(score)
+    with transaction(db_path) as conn:
+        above_buckets, total = conn.execute(
+            f"SELECT COALESCE(SUM(CASE WHEN bucket > ? THEN count END), 0), COALESCE(SUM(count), 0) "
+            f"FROM {LEADERBOARD_TABLE}",
+            (bucket,)
+        ).fetchone()
+        above_in_bucket = conn.execute(
+            "SELECT COUNT(*) FROM ranking WHERE score > ? AND score < ?",
+            (score, (bucket + 1) * HISTOGRAM_WIDTH)
+        ).fetchone()[0]
+    return above_buckets + above_in_bucket + 1, total
+
+
+def _today() -> str:
+    return datetime.date.today().isoformat()
+
+
+def _week_start(day: str) -> str:
+    # 週はその週の月曜日の日付で表す（集計表のトリガーと同じ）
+    date = datetime.date.fromisoformat(day)
+    return (date - datetime.timedelta(days=date.weekday())).isoformat()
+
+
+def _get_best(table: str, period: str, db_path: str):
+    with transaction(db_path) as conn:
+        return conn.execute(
+            f"SELECT b.score, r.timestamp, b.plays FROM {table} AS b "
+            f"LEFT JOIN ranking AS r ON r.id = b.ranking_id WHERE b.period = ?",
+            (period,)
+        ).fetchone()
+
+
+def get_daily_best(day: str = None, db_path: str = DB_PATH):
+    """
+    day（YYYY-MM-DD、省略時は今日）の最高点。戻り値は (score, timestamp, その日のプレイ回数)、記録が無ければ None
+    """
+    return _get_best("ranking_daily_best", day or _today(), db_path)
+
+
+def get_weekly_best(day: str = None, db_path: str = DB_PATH):
+    """
+    day（省略時は今日）を含む週（月曜日〜日曜日）の最高点。戻り値は get_daily_best と同じ
+    """
+    return _get_best("ranking_weekly_best", _week_start(day or _today()), db_path)
+
+
+def get_histogram(db_path: str = DB_PATH) -> list:
+    """
+    得点の分布。[(区間の下限, 件数), ...] を得点の低い順に返す（区間の幅は storage.HISTOGRAM_WIDTH）
+    """
+    with transaction(db_path) as conn:
+        rows = conn.execute(f"SELECT bucket, count FROM {LEADERBOARD_TABLE} ORDER BY bucket").fetchall()
+    return [(bucket * HISTOGRAM_WIDTH, count) for bucket, count in rows]
+
+
+def rebuild(db_path: str = DB_PATH):
+    """
+    集計表を ranking の内容から作り直す（ranking を直接書き換えた場合に使う）
+    """
+    with transaction(db_path) as conn:
+        rebuild_leaderboard(conn)
@@ -0,0 +1,266 @@
+"""
+Web モードで起動したゲームに、ブラウザの代わりに Flet の WebSocket プロトコルで接続する
+プレイヤーを N 人同時に動かし、操作から画面更新が届くまでの遅延を集計する負荷試験。
+
+使い方:
+    flet run --web --port 8550 main.py                      # 別の端末でサーバーを起動しておく
+    python loadtest.py --sessions 40 --duration 60          # 40 人が 60 秒間遊ぶ
+
+各プレイヤーは「ゲームスタート」を押し、カテゴリを開いて商品を追加し、コインをタップして会計する操作を繰り返す。
+遅延は、イベントを送ってから最初の画面更新（pageControlsBatch など）を受け取るまでの時間。
+カウントダウンの更新など、操作と関係なく届くメッセージが先に届いた場合もそれを応答とみなすため、目安の値になる。
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import aiohttp
+
+CATEGORIES = ("FF1", "なまもの", "コロッケ", "常温", "中華まん", "サラダ", "おにぎり", "飲み物")
+RESPONSE_TIMEOUT = 5.0
+
+
+class ControlTree:
+    """
+    サーバーから送られてくるコントロールの追加・変更・削除を反映して、現在の画面のコントロールを保持する
+    """
+
+    def __init__(self, controls: dict):
+        self.controls = dict(controls)
+
+    def apply(self, message: dict):
+        action = message["action"]
+        payload = message["payload"]
+        if action == "pageControlsBatch":
+            for sub in payload:
+                self.apply(sub)
+        elif action == "addPageControls":
+            self._remove(payload.get("trimIDs") or [])
+            for control in payload["controls"]:
+                parent = self.controls.get(control["p"])
+                if parent is not None and control["i"] not in parent["c"]:
+                    at = int(control.get("at", len(parent["c"])))
+                    parent["c"].insert(at, control["i"])
+                self.controls[control["i"]] = control
+        elif action == "updateControlProps":
+            for props in payload["props"]:
+                control = self.controls.get(props["i"])
+                if control is not None:
+                    control.update(props)
+        elif action == "cleanControl":
+            for control_id in payload["ids"]:
+                control = self.controls.get(control_id)
+                if control is not None:
+                    self._remove(list(control["c"]))
+        elif action == "removeControl":
+            self._remove(payload["ids"])
+
+    def _remove(self, ids):
+        for control_id in ids:
+            control = self.controls.pop(control_id, None)
+            if control is None:
+                continue
+            parent = self.controls.get(control["p"])
+            if parent is not None and control_id in parent["c"]:
+                parent["c"].remove(control_id)
+            self._remove(list(control["c"]))
+
+    def top_view(self):
+        page = self.controls.get("page")
+        views = [c for c in page["c"] if self.controls.get(c, {}).get("t") == "view"] if page else []
+        return views[-1] if views else None
+
+    def find(self, control_type: str, **attrs) -> list:
+        """
+        一番上の画面（view）の中から、種類と属性が一致するコントロールの id を表示順に返す
+        """
+        found = []
+        stack = [self.top_view()] if self.top_view() else []
+        while stack:
+            control = self.controls.get(stack.pop())
+            if control is None:
+                continue
+            if control["t"] == control_type and all(control.get(k) == v for k, v in attrs.items()):
+                found.append(control["i"])
+            stack.extend(reversed(control["c"]))
+        return found
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # 操作名 → 遅延 [秒]
+        self.errors = defaultdict(int)
+        self.messages = 0
+
+    def report(self, elapsed: float, sessions: int):
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"セッション数: {sessions}, 経過時間: {elapsed:.1f} 秒, 操作数: {total} "
+              f"({total / max(elapsed, 1e-9):.1f} 操作/秒), 受信メッセージ: {self.messages}")
+        print(f"{'操作':<12} {'回数':>7} {'p50 [ms]':>10} {'p95 [ms]':>10} {'p99 [ms]':>10} {'最大 [ms]':>10}")
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+
+            def pick(q):
+                return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+            print(f"{name:<12} {len(ordered):>7} {pick(0.5):>10.1f} {pick(0.95):>10.1f} "
+                  f"{pick(0.99):>10.1f} {ordered[-1] * 1000:>10.1f}")
+        for name, count in sorted(self.errors.items()):
+            print(f"エラー: {name} × {count}")
+
+
+class SimulatedPlayer:
+    """
+    1 つのブラウザ（セッション）の代わりに WebSocket で接続して操作するプレイヤー
+    """
+
+    def __init__(self, http, url: str, stats: Stats, rng: random.Random, think: float):
+        self.http = http
+        self.url = url
+        self.stats = stats
+        self.rng = rng
+        self.think = think
+        self.ws = None
+        self.tree = None
+        self._updated = asyncio.Event()
+
+    async def connect(self):
+        started = time.perf_counter()
+        self.ws = await self.http.ws_connect(self.url)
+        await self.ws.send_str(json.dumps({"action": "registerWebClient", "payload": {
+            "pageName": "", "pageRoute": "/", "pageWidth": "1280", "pageHeight": "800",
+            "windowWidth": "1280", "windowHeight": "800", "windowTop": "0", "windowLeft": "0",
+            "isPWA": "false", "isWeb": "true", "isDebug": "false", "platform": "linux",
+            "platformBrightness": "light", "media": "{}", "sessionId": "",
+        }}))
+        message = json.loads((await self.ws.receive(timeout=RESPONSE_TIMEOUT)).data)
+        self.tree = ControlTree(message["payload"]["session"]["controls"])
+        self._receiver = asyncio.create_task(self._receive_loop())
+        # ホーム画面が届くまでを接続時間とする
+        await self._wait_for(lambda: self.tree.find("elevatedbutton", text="ゲームスタート"))
+        self.stats.latencies["connect"].append(time.perf_counter() - started)
+
+    async def _receive_loop(self):
+        async for msg in self.ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            self.stats.messages += 1
+            self.tree.apply(json.loads(msg.data))
+            self._updated.set()
+
+    async def _wait_for(self, condition, timeout: float = RESPONSE_TIMEOUT):
+        deadline = time.perf_counter() + timeout
+        while True:
+            result = condition()
+            if result:
+                return result
+            self._updated.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.wait_for(self._updated.wait(), remaining)
+
+    async def send_event(self, name: str, target: str, event: str = "click", data: str = "") -> bool:
+        """
+        イベントを送り、次の画面更新が届くまでの時間を name の遅延として記録する。
+        ゲームオーバーなどで画面が切り替わり、対象のコントロールが既に無い場合は送らずに False を返す
+        """
+        if target not in self.tree.controls:
+            return False
+        self._updated.clear()
+        started = time.perf_counter()
+        await self.ws.send_str(json.dumps({"action": "pageEventFromWeb", "payload": {
+            "eventTarget": target, "eventName": event, "eventData": data,
+        }}))
+        try:
+            await asyncio.wait_for(self._updated.wait(), RESPONSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats.errors[f"{name}: 応答なし"] += 1
+            return False
+        self.stats.latencies[name].append(time.perf_counter() - started)
+        return True
+
+    async def pause(self):
+        await asyncio.sleep(self.think * self.rng.uniform(0.5, 1.5))
+
+    async def play_round(self):
+        # カテゴリを開いて商品を 1 つ追加する
+        category = self.rng.choice(CATEGORIES)
+        button = self.tree.find("elevatedbutton", text=category)
+        if not button:
+            # 前の問題の演出中などでゲーム画面が出ていない場合は、ゲーム画面かホーム画面に切り替わるまで待つ
+            await self._wait_for(lambda: self.tree.find("elevatedbutton", text="会計")
+                                 or self.tree.find("elevatedbutton", text="ゲームスタート"))
+            return
+        if not await self.send_event("category", button[0]):
+            return
+        add_buttons = await self._wait_for(lambda: self.tree.find("iconbutton", icon="add"))
+        await self.pause()
+        if not await self.send_event("add_item", self.rng.choice(add_buttons)):
+            return
+        await self.pause()
+        # コインをいくつかタップする
+        coins = self.tree.find("gesturedetector")
+        for _ in range(self.rng.randint(1, 4)):
+            if coins:
+                tap = json.dumps({"kind": "touch", "lx": 10, "ly": 10, "gx": 10, "gy": 10})
+                if not await self.send_event("coin_tap", self.rng.choice(coins), "tap", tap):
+                    return
+                await self.pause()
+        # 会計する（結果の表示後、次の問題が表示されるのを待つ）
+        checkout = self.tree.find("elevatedbutton", text="会計")
+        if checkout:
+            await self.send_event("checkout", checkout[0])
+        await asyncio.sleep(2.5)
+
+    async def run(self, until: float):
+        try:
+            await self.connect()
+            start = self.tree.find("elevatedbutton", text="ゲームスタート")
+            await self.send_event("start_game", start[0])
+            while time.perf_counter() < until:
+                if self.tree.find("elevatedbutton", text="ゲームスタート"):
+                    # ゲームオーバーでホーム画面に戻ったら、もう一度始める
+                    await self.send_event("start_game", self.tree.find("elevatedbutton", text="ゲームスタート")[0])
+                    continue
+                await self.play_round()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as ex:
+            self.stats.errors[type(ex).__name__] += 1
+        finally:
+            if self.ws is not None:
+                await self.ws.close()
+
+
+async def run_load_test(url: str, sessions: int, duration: float, ramp_up: float, think: float, seed: int):
+    stats = Stats()
+    started = time.perf_counter()
+    until = started + ramp_up + duration
+    async with aiohttp.ClientSession() as http:
+        tasks = []
+        for i in range(sessions):
+            player = SimulatedPlayer(http, url, stats, random.Random(seed + i), think)
+            tasks.append(asyncio.create_task(player.run(until)))
+            # 接続が一度に集中しないよう、ramp_up 秒かけて順に接続する
+            await asyncio.sleep(ramp_up / max(sessions, 1))
+        await asyncio.gather(*tasks)
+    stats.report(time.perf_counter() - started, sessions)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web モードのゲームサーバーの負荷試験")
+    parser.add_argument("--url", default="ws://127.0.0.1:8550/ws")
+    parser.add_argument("--sessions", type=int, default=30, help="同時に遊ぶプレイヤー数")
+    parser.add_argument("--duration", type=float, default=60.0, help="全員が接続してから遊び続ける秒数")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="全員が接続し終えるまでの秒数")
+    parser.add_argument("--think", type=float, default=0.3, help="操作の間隔の平均 [秒]")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args.url, args.sessions, args.duration, args.ramp_up, args.think, args.seed))
+
+
+if __name__ == "__main__":
+    main()
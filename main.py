@@ -1,123 +1,150 @@
+from startup_profile import profile  # 起動時間の計測（最初に import して起動時刻を記録する）
 import threading
 import flet as ft
-import sqlite3
 import random
 import os
-import asyncio
 import time
-from exchange_calculate import calculate_payment
-import pygame 
-from score import record_ranking  # ranking 登録用
-
-pygame.mixer.init()
-global_score = 0
-global_lives = 3
-
-def fetch_random_orders(db_path="flet_app.db"):
-    # 全商品を取得してからランダムに選ぶ（重複もあり、個数をまとめる）
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT name, price, image FROM line_list")
-    all_orders = [{"name": row[0], "price": row[1], "image": row[2]} for row in cursor.fetchall()]
-    conn.close()
-    # ランダムな注文個数（1～6）で抽出（重複あり）
-    n = random.randint(1, 6)
-    orders = random.choices(all_orders, k=n)
-    # 同じ商品の場合、qty を集計
-    combined = {}
-    for order in orders:
-        key = order["name"]
-        if key in combined:
-            combined[key]["qty"] += 1
-        else:
-            order["qty"] = 1
-            combined[key] = order
-    return list(combined.values())
-
-# 注文内容の一致を判定するヘルパー関数
-def is_orders_matching(customer_order, processed_orders) -> bool:
-    if len(customer_order) != len(processed_orders):
-        return False
-    sorted_customer = sorted(customer_order, key=lambda x: x["name"])
-    sorted_processed = sorted(processed_orders, key=lambda x: x["name"])
-    for cust, proc in zip(sorted_customer, sorted_processed):
-        if cust["name"] != proc["name"]:
-            return False
-        if cust["price"] != proc["price"]:
-            return False
-        if cust.get("qty", 1) != proc.get("qty", 1):
-            return False
-    return True
+from score import initialize_scores_db, get_rankings_page  # ranking 取得用
+from write_queue import get_write_queue  # ranking / scores の書き込み（バックグラウンドでまとめてコミット）
+from leaderboard import get_rank, get_daily_best, get_weekly_best  # ランキングの集計（順位・今日／今週の最高点）
+from catalog import get_catalog  # 商品カタログ（メモリ上にキャッシュ）
+from currency import get_change_table, format_breakdown  # お釣りの最少枚数の内訳（ヒント表示用）
+from game_engine import (  # ゲームのルール（画面に依存しない部分）
+    generate_order, order_total, grade_efficiency, new_round_seed, deal_round,
+    GameState, RoundState, ORDER_MISTAKE, CHANGE_MISTAKE, INITIAL_LIVES, ROUND_SECONDS,
+)
+from scheduler import get_scheduler  # カウントダウン・演出の時間管理
+from perf import perf  # 操作ごとの処理時間の計測（--perf で起動したときだけ有効）
+from session_log import start_recorder, get_recorder, close_recorder  # プレイの記録（--record で起動したときだけ記録する。replay.py で再生）
+from sound_bank import SoundBank, configured_buffer  # 効果音（起動時にデコード済み）
+from thumbnails import thumbnail_src  # 表示サイズ別のサムネイル（build_assets.py で生成）
+from animations import effect_src, prepare_effects  # 演出用アニメーション（軽量化・事前確認済み）
+
+# pygame の初期化と効果音のデコードは、ホーム画面の表示後に warm_up() で行う
+# バッファサイズは --sound-buffer N（または REGI_SOUND_BUFFER=N）で変えられる
+sound_bank = SoundBank(buffer=configured_buffer())
+# --perf 指定時は、タップから効果音が鳴るまでの遅延も計測結果に載せる
+perf.add_report("sound", sound_bank.latency_stats)
+CATEGORY_PAGE_SIZE = 40  # カテゴリ画面で一度に読み込む商品数
+SEARCH_LIMIT = 100  # 商品検索で表示する最大件数
+profile.mark("import: main モジュールの読み込み完了")
+
+def fetch_random_orders(db_path="flet_app.db", rng=random):
+    # 全商品（カタログのキャッシュ）からランダムに選ぶ（重複もあり、個数をまとめる）
+    return generate_order(get_catalog(db_path).snapshot(), rng)
 
 def play_bgm(filename: str):
     # assets/sounds フォルダ内のBGMファイルをループ再生
-    bgm_path = os.path.join("assets", "sounds", filename)
-    try:
-        bgm = pygame.mixer.Sound(bgm_path)
-        bgm.set_volume(0.1)
-        bgm.play(loops=-1)  # ループ再生
-    except Exception as ex:
-        print(f"Error playing BGM: {ex}")
+    sound_bank.play_bgm(filename)
 
 def stop_bgm():
-    pygame.mixer.stop()
-
-def play_sound(filename: str):
-    # assets/sounds フォルダ内のサウンドファイルを再生
-    sound_path = os.path.join("assets", "sounds", filename)
-    try:
-        sound = pygame.mixer.Sound(sound_path)
-        sound.set_volume(0.1)
-        sound.play()
-    except Exception as ex:
-        print(f"Error playing sound: {ex}")
-
-# 新たな関数: available_coins の設定および支払額選択
-def select_payment(order_sum: int, available: dict) -> int:
+    sound_bank.stop_bgm()
+
+def play_sound(filename: str, tapped_at: float = None):
+    # assets/sounds フォルダ内のサウンドファイルを再生（tapped_at を渡すとタップからの遅延を記録する）
+    sound_bank.play(filename, tapped_at)
+
+class OrderRow:
     """
-    available: {コイン額面: 個数, ...}
-    order_sum 以上の支払額で、可能な組み合わせの中から最小額を返す。
-    DP により、利用可能な金額の組み合わせを評価する。
+    右パネル（入力内容）の注文 1 行分のコントロール。
+    商品 id をキーにして保持し、数量が変わったときは数量と小計のテキストだけを更新する。
     """
-    total_available = sum(denom * count for denom, count in available.items())
-    max_sum = total_available
-    dp = [False] * (max_sum + 1)
-    dp[0] = True
-
-    # 各額面ごとに個数分ループ
-    for denom in sorted(available.keys(), reverse=True):
-        quantity = available[denom]
-        for _ in range(quantity):
-            for s in range(max_sum, denom - 1, -1):
-                if dp[s - denom]:
-                    dp[s] = True
-
-    for s in range(order_sum, max_sum + 1):
-        if dp[s]:
-            return s
-    return order_sum
-
-def simulate_payment(order_sum: int):
+
+    def __init__(self, line, on_change_quantity, on_delete):
+        self.line = line  # カートの行（cart.CartLine）。数量はカート側で書き換える
+        product_id = line.id
+        image_path = thumbnail_src(line.image, 40)
+        self.qty_text = ft.Text(f"{line.qty}")
+        self.subtotal_text = ft.Text(f"計: {line.subtotal}円")
+        self.control = ft.Row(
+            controls=[
+                ft.Image(src=image_path, width=40, height=40, fit="contain"),
+                ft.Text(line.name),
+                ft.Text(f"{line.price}円"),
+                ft.IconButton(icon=ft.Icons.REMOVE, on_click=lambda e: on_change_quantity(product_id, -1)),
+                self.qty_text,
+                ft.IconButton(icon=ft.Icons.ADD, on_click=lambda e: on_change_quantity(product_id, 1)),
+                self.subtotal_text,
+                ft.IconButton(icon=ft.Icons.DELETE, on_click=lambda e: on_delete(product_id))
+            ],
+            spacing=10
+        )
+
+    def refresh(self):
+        self.qty_text.value = f"{self.line.qty}"
+        self.subtotal_text.value = f"計: {self.line.subtotal}円"
+        self.qty_text.update()
+        self.subtotal_text.update()
+
+class CoinTray:
     """
-    お客さんが持っている小銭・札をランダムに設定（各額面の個数は 0～3 の乱数）。
-    合計金額が order_sum よりも大きくなるよう調整し、その中から
-    お釣り（支払額 - order_sum）が最小になる支払い額を返す。
+    画面右上のお釣り置き場。額面ごとに 1 つの枠（積み上げ画像＋枚数バッジ）を持ち、
+    コインが追加されたら、その額面の枠だけを書き換える。
     """
-    denominations = [10000, 5000, 1000, 500, 100, 50, 10, 5, 1]
-    available = {}
-    for d in denominations:
-        available[d] = random.randint(0, 4)
-    total_available = sum(d * cnt for d, cnt in available.items())
-    # 合計が order_sum 以下の場合は、最低額 1円硬貨で足す
-    while total_available <= order_sum:
-        available[1] += 1
-        total_available = sum(d * cnt for d, cnt in available.items())
-    payment = select_payment(order_sum, available)
-    return payment, available
+
+    def __init__(self, values):
+        self.counts = {}
+        self.total_coins = 0
+        self._slots = {}
+        self._badges = {}
+        # 額面の小さい順に上から並べる（大きい額面ほど下に積まれる）
+        for value in values:
+            badge = ft.Text("", size=14, weight="bold", color=ft.Colors.WHITE)
+            self._badges[value] = badge
+            self._slots[value] = ft.Stack(
+                controls=[
+                    ft.Image(
+                        src=os.path.join("assets", "coins", f"{value}yentumu.png").replace("\\", "/"),
+                        width=80,
+                        height=80,
+                        fit="contain"
+                    ),
+                    ft.Container(
+                        content=badge,
+                        right=0,
+                        top=0,
+                        padding=ft.padding.symmetric(horizontal=6, vertical=2),
+                        bgcolor=ft.Colors.RED_400,
+                        border_radius=10
+                    )
+                ],
+                width=80,
+                height=80,
+                visible=False
+            )
+        self.control = ft.Column(
+            controls=list(self._slots.values()),
+            spacing=-30,  # オフセットはお好みで調整
+            alignment=ft.MainAxisAlignment.END
+        )
+        self.reset()
+
+    def add(self, value: int):
+        """
+        value 円のコインを 1 枚追加し、書き換えた枠のコントロールを返す（呼び出し側で update する）
+        """
+        self.counts[value] += 1
+        self.total_coins += 1
+        slot = self._slots[value]
+        slot.visible = True
+        self._badges[value].value = f"×{self.counts[value]}"
+        return slot
+
+    def reset(self):
+        """
+        すべての枠を空にする（呼び出し側で self.control を update する）
+        """
+        self.counts = {value: 0 for value in self._slots}
+        self.total_coins = 0
+        for value, slot in self._slots.items():
+            slot.visible = False
+            self._badges[value].value = ""
 
 # --------------------
 # ホーム画面
+@perf.timed("home_view")
 def home_view(page: ft.Page):
+    get_scheduler(page).cancel_all()
     stop_bgm()
     play_bgm("bgm1.mp3")
     page.views.clear()
@@ -162,30 +189,54 @@ def home_view(page: ft.Page):
 # ランキング画面
 def ranking_view(page: ft.Page):
     play_sound("click2.mp3")
-    conn = sqlite3.connect("flet_app.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ranking (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            score INTEGER,
-            timestamp TEXT
-        )
-    """)
-    conn.commit()
-    cursor.execute("SELECT  score, timestamp FROM ranking ORDER BY score DESC")
-    rows = cursor.fetchall()
-    conn.close()
-
-    ranking_controls = []
-    for r in rows:
-        ranking_controls.append(ft.Text(f" {r[0]}点 ({r[1]})"))
+
+    # 画面を開くときは先頭ページだけ読み込み、スクロールが末尾に近づいたら次のページを追加する
+    page_size = 100
+    next_cursor = None
+    loading = threading.Lock()
+
+    ranking_list = ft.ListView(
+        expand=True,
+        item_extent=24,  # 行の高さを固定して、表示範囲外の行を組み立てないようにする
+        on_scroll_interval=100,
+    )
+
+    def load_next_page():
+        nonlocal next_cursor
+        rows, next_cursor = get_rankings_page(after=next_cursor, limit=page_size)
+        ranking_list.controls.extend(ft.Text(f" {r[0]}点 ({r[1]})") for r in rows)
+
+    def on_scroll(e: ft.OnScrollEvent):
+        if next_cursor is None or e.pixels < e.max_scroll_extent - 200:
+            return
+        # スクロールイベントは連続して届くため、読み込み中の重複実行を防ぐ
+        if not loading.acquire(blocking=False):
+            return
+        try:
+            if next_cursor is not None:
+                load_next_page()
+                ranking_list.update()
+        finally:
+            loading.release()
+
+    load_next_page()
+    ranking_list.on_scroll = on_scroll
+
+    # 今日・今週の最高点は集計表から読む（ranking 全体を調べない）
+    daily_best = get_daily_best()
+    weekly_best = get_weekly_best()
+    best_summary = (f"今日の最高: {daily_best[0] if daily_best else '-'}点　"
+                    f"今週の最高: {weekly_best[0] if weekly_best else '-'}点")
+
     view = ft.View(
         route="/ranking",
         controls=[
             ft.Column(
+                expand=True,
                 controls=[
                     ft.Text("ランキング", size=30, weight="bold"),
-                    ft.Column(controls=ranking_controls, scroll=True),
+                    ft.Text(best_summary, size=16),
+                    ranking_list,
                     ft.ElevatedButton("ホームへ", on_click=lambda e: home_view(page))
                 ]
             )
@@ -194,148 +245,188 @@ def ranking_view(page: ft.Page):
     page.views.append(view)
     page.go(view.route)
 
+def get_game_state(page: ft.Page) -> GameState:
+    """
+    このセッション（ブラウザ・ウィンドウ）で遊んでいるゲームの得点と残りライフ。
+    Web モードでは 1 つのプロセスで複数のプレイヤーが遊ぶため、モジュール変数ではなくセッションに持たせる
+    """
+    state = page.session.get("game_state")
+    if state is None:
+        state = GameState()
+        page.session.set("game_state", state)
+    return state
+
 # --------------------
 # ゲーム画面（既存UI・処理そのまま）
+@perf.timed("main_game")
 def main_game(page: ft.Page):
+    # ホーム画面からのゲーム開始（得点とライフを初期化し、BGM・タイトル設定の後、最初の問題を出す）
+    page.session.set("game_state", GameState())
+    start_recorder(page, get_catalog().snapshot()).game_start()  # 記録はゲームごとに 1 ファイル
     stop_bgm()
     play_bgm("bgm2.mp3")
 
     play_sound("click2.mp3")
     page.title = "レジ打ちゲーム"
     page.vertical_alignment = "start"
-    page.views.clear()
     page.scroll = "auto"
+    next_round(page)
+
+@perf.timed("next_round")
+def next_round(page: ft.Page):
+    # 前の問題で予約された演出・遷移・カウントダウンがこの問題に割り込まないよう、すべて取り消す
+    get_scheduler(page).cancel_all()
 
-    lives = 3
-    customer_order = fetch_random_orders()
-    order_sum = sum(item['price'] * item['qty'] for item in customer_order)
-    simulated_payment, available_coins = simulate_payment(order_sum)
+    # 問題は乱数の種から作る（種を記録しておけば、replay.py で同じ問題を作り直せる）
+    seed = new_round_seed()
+    get_recorder(page).round_start(seed)
+    customer_order, simulated_payment, available_coins, paid_coins = deal_round(get_catalog().snapshot(), seed)
+    order_sum = order_total(customer_order)
     print(f"注文合計: {order_sum}円, お客さん所持: {available_coins}, 支払い: {simulated_payment}円")
-    processed_orders = []
-    operator_total = 0
-    numeric_input = 0
+
+    # ゲーム画面はセッションにつき一度だけ作り、問題ごとには中身だけを入れ替える
+    reset_round = page.session.get("reset_round")
+    if reset_round is None:
+        reset_round = build_game_screen(page)
+        page.session.set("reset_round", reset_round)
+    reset_round(customer_order, simulated_payment, paid_coins)
+
+def build_game_screen(page: ft.Page):
+    """
+    ゲーム画面のコントロールを組み立て、問題を切り替えるための reset_round(order, payment, paid_coins) を返す。
+    カテゴリボタンやコインキーなど問題によらない部分は使い回し、
+    reset_round では客の注文欄の差し替えと入力内容・カウンタのリセットだけを行う。
+    """
+    scheduler = get_scheduler(page)
+
+    # 問題ごとの状態（reset_round で作り直す）。入力と判定は RoundState が持ち、ここでは画面の更新だけを行う
+    round_state = None
+    countdown = None
 
     # ------------------------------
-    # 追加：ライフ表示用コンテナ
-    life_container = ft.Container()
+    # 追加：ライフ表示用コンテナ（アイコンは使い回し、画像だけを切り替える）
+    max_lives = INITIAL_LIVES
+    life_icons = [ft.Image(src="assets/images/life.png", width=60, height=60) for _ in range(max_lives)]
+    life_container = ft.Container(content=ft.Row(controls=life_icons))
 
     def update_life_icons():
-        icons = []
-        max_lives = 3
-        for i in range(max_lives):
-            # global_lives で残ライフを判定（i番目が生きていれば life.png、そうでなければ lifeout.png）
-            icon_src = "assets/images/life.png" if i < global_lives else "assets/images/lifeout.png"
-            icons.append(ft.Image(src=icon_src, width=60, height=60))
-        life_container.content = ft.Row(controls=icons)
-    update_life_icons()
+        for i, icon in enumerate(life_icons):
+            # 残りライフで判定（i番目が生きていれば life.png、そうでなければ lifeout.png）
+            icon.src = "assets/images/life.png" if i < get_game_state(page).lives else "assets/images/lifeout.png"
     # ------------------------------
 
-    answered = False  # この問題で既に回答済みかチェックするフラグ
-    countdown_remaining = 60  # 60秒カウントダウン
+    round_seconds = ROUND_SECONDS  # 60秒カウントダウン
+    countdown_remaining = round_seconds
     timer_widget = ft.Text(value=f"{countdown_remaining}秒", size=35)  # color will be set in update_countdown
     
     # 上部GIFとタイマー表示用（timer_widget を kutiobake.gif の下に配置）
     top_gif = ft.Image(
-        src="assets/gifs/kutiobake.gif",
+        src=effect_src("idle"),
         width=300,
         height=350,
         fit="contain"
     )
+    idle_layers = [
+        ft.Container(
+            expand=True,
+            alignment=ft.Alignment(-0.4, -0.4),
+            content=top_gif
+        ),
+        ft.Container(
+            expand=True,
+            alignment=ft.Alignment(-0.3, 1.0),  # 下部に配置
+            content=timer_widget
+        )
+    ]
+    # 怒り・パンチの演出は最初から透明（opacity=0）で重ねておき、opacity の切り替えだけで表示する
+    # （クライアント側で事前に読み込み・デコードされるため、演出の開始時に引っかからない）
+    def effect_layer(name, alignment, width, height):
+        src = effect_src(name)
+        if src is None:
+            return None  # 演出ファイルが無い場合は表示しない（起動時に警告を出している）
+        return ft.Container(
+            expand=True,
+            alignment=alignment,
+            opacity=0,
+            content=ft.Image(src=src, width=width, height=height, fit="contain")
+        )
+
+    angry_layers = [
+        layer for layer in (
+            effect_layer("angry", ft.Alignment(-0.4, -0.4), 450, 350),
+            effect_layer("threat", ft.Alignment(0, -0.4), 359, 350),
+        )
+        if layer is not None
+    ]
+    punch_layers = [
+        layer for layer in (
+            effect_layer("punch", ft.alignment.center, page.window_width, page.window_height),
+        )
+        if layer is not None
+    ]
+    all_layers = idle_layers + angry_layers + punch_layers
     top_stack = ft.Stack(
-        controls=[
-            ft.Container(
-                expand=True,
-                alignment=ft.Alignment(-0.4, -0.4),
-                content=top_gif
-            ),
-            ft.Container(
-                expand=True,
-                alignment=ft.Alignment(-0.3, 1.0),  # 下部に配置
-                content=timer_widget
-            )
-        ],
+        controls=all_layers,
         height=400
     )
+
+    def show_layers(layers):
+        # 指定したレイヤーだけを表示し、それ以外は透明にする
+        for layer in all_layers:
+            layer.opacity = 1 if any(layer is shown for shown in layers) else 0
+
+    def show_angry_face():
+        # ライフが減少したとき、上部GIFを怒った顔に変更
+        angry_src = effect_src("angry")
+        if angry_src is not None:
+            top_gif.src = angry_src
+            top_gif.width = 450
+            top_gif.height = 350
     
-    # タイマー更新用の再帰関数
-    def update_countdown():
-        nonlocal countdown_remaining, answered
-        if answered:
-            return
+    # カウントダウンの表示更新（残り秒数が変わるたびに scheduler から呼ばれる）
+    @perf.timed("update_countdown")
+    def update_countdown(seconds_left):
+        nonlocal countdown_remaining
+        countdown_remaining = seconds_left
+        timer_widget.value = f"{countdown_remaining}秒"
+        # 残りが10秒未満なら赤色、それ以外は黒色で表示
+        timer_widget.color = "red" if countdown_remaining < 11 else "black"
+        timer_widget.update()
+
+    # タイムアウト時の処理（既存の内容）＋追加処理
+    @perf.timed("on_timeout")
+    def on_timeout():
+        get_recorder(page).timeout()
+        outcome = round_state.timeout()
+        if outcome is None:
+            return  # 既に回答済み
+        calc_button.disabled = True
+        state = round_state.state
+        get_recorder(page).round_end(outcome, state.score)
+        update_life_icons()
+        change_display.value = f"時間切れ！ 残りライフ: {state.lives}"
+
+        show_layers(angry_layers)
+        page.update()
 
-        if countdown_remaining > 0:
-            countdown_remaining -= 1
-            timer_widget.value = f"{countdown_remaining}秒"
-            # 残りが10秒未満なら赤色、それ以外は黒色で表示
-            timer_widget.color = "red" if countdown_remaining < 11 else "black"
+        # killyou.gif 表示後1秒で punch.mp3 と grass.mp3 を再生し、
+        # その直後に画面全体で punch.gif を表示する処理
+        def show_punch():
+            show_layers(punch_layers)
             page.update()
-            threading.Timer(1, update_countdown).start()
-        else:
-            # タイムアウト時の処理（既存の内容）＋追加処理
-            if not answered:
-                answered = True
-                calc_button.disabled = True
-                global global_lives
-                global_lives -= 1
-                update_life_icons()
-                change_display.value = f"時間切れ！ 残りライフ: {global_lives}"
-                
-                top_stack.controls = [
-                    ft.Container(
-                        expand=True,
-                        alignment=ft.Alignment(-0.4, -0.4),
-                        content=ft.Image(
-                            src="assets/gifs/oikari2.gif",
-                            width=450,
-                            height=350,
-                            fit="contain"
-                        )
-                    ),
-                    ft.Container(
-                        expand=True,
-                        alignment=ft.Alignment(0, -0.4),
-                        content=ft.Image(
-                            src="assets/gifs/killyou.gif",
-                            width=359,
-                            height=350,
-                            fit="contain"
-                        )
-                    )
-                ]
-                page.update()
-                
-                # killyou.gif 表示後1秒で punch.mp3 と grass.mp3 を再生し、
-                # その直後に画面全体で punch.gif を表示する処理
-                def show_punch():
-                    top_stack.controls = [
-                        ft.Container(
-                            expand=True,
-                            alignment=ft.alignment.center,
-                            content=ft.Image(
-                                src="assets/gifs/punch.gif",
-                                width=page.window_width,
-                                height=page.window_height,
-                                fit="contain"
-                            )
-                        )
-                    ]
-                    page.update()
-                    if global_lives <= 0:
-                        threading.Timer(2, game_over).start()
-                    else:
-                        threading.Timer(2, lambda: main_game(page)).start()
-                
-                def play_sounds_and_show_punch():
-                    play_sound("punch.mp3")
-                    play_sound("grass.mp3")
-                    show_punch()
-                
-                threading.Timer(1, play_sounds_and_show_punch).start()
-    
-    # スタート時にカウントダウン開始
-    update_countdown()
+            if state.over:
+                scheduler.call_later(2, game_over)
+            else:
+                scheduler.call_later(2, next_round, page)
+
+        def play_sounds_and_show_punch():
+            play_sound("punch.mp3")
+            play_sound("grass.mp3")
+            show_punch()
+
+        scheduler.call_later(1, play_sounds_and_show_punch)
 
-    # processed_orders 表示用のカラム（白背景）
+    # 入力した注文（cart）表示用のカラム（白背景）
     order_list = ft.Column(controls=[])
     order_list_container = ft.Container(
         expand=True,
@@ -348,6 +439,8 @@ def main_game(page: ft.Page):
     change_display = ft.Text("お釣り: ", size=16, color="green")
 
     # --- order_info 部分の変更 ---
+    payment_text = ft.Text("", size=16, color="red")
+    payment_breakdown_text = ft.Text("", size=14)
     # order_payment_info コンテナを定義（初期は非表示）
     order_payment_info = ft.Container(
         expand=True,
@@ -356,32 +449,34 @@ def main_game(page: ft.Page):
             #scrall = ft.ScrollMode.ALWAYS,
             controls=[
                 #ft.Text(f"注文合計金額　　　　　{order_sum}円", size=16),
-                ft.Text(f"支払い金額　　　{simulated_payment}円", size=16, color="red")
+                payment_text,
+                payment_breakdown_text
             ]
         ),
         visible=False
     )
 
+    # 客側の注文内容（問題ごとに reset_round で中身を差し替える）
+    customer_order_list = ft.Column(
+        #scroll=ft.ScrollMode.ALWAYS,
+        controls=[],
+        spacing=5
+    )
+
+    # 商品名での検索（Enter または検索ボタンで結果の一覧を開く）
+    search_field = ft.TextField(
+        hint_text="商品名で検索",
+        width=240,
+        dense=True,
+        on_submit=lambda e: show_search_view(search_field.value)
+    )
+
     order_info_content = ft.Column(
         scroll=ft.ScrollMode.AUTO,
         controls=[
             ft.Text("客側の注文内容", size=20, weight="bold", color="blue"),
             ft.Divider(height=10),
-            ft.Column(
-                #scroll=ft.ScrollMode.ALWAYS,
-                controls=[
-                    ft.Row(
-                        controls=[
-                            ft.Image(src=os.path.join("assets", "images", item["image"]).replace("\\", "/"), width=50, height=50, fit="contain"),
-                            ft.Text(f"{item['name']}  {item['price']}円", size=16),
-                            ft.Text(f"数量: {item['qty']}")
-                        ],
-                        spacing=10
-                    )
-                    for item in customer_order
-                ],
-                spacing=5
-            ),
+            customer_order_list,
             ft.Divider(height=20),
             # 支払情報はここに配置
             order_payment_info,
@@ -399,6 +494,13 @@ def main_game(page: ft.Page):
                     ft.ElevatedButton("飲み物", on_click=lambda e: show_category_view("飲み物"))
                 ],
                 
+                spacing=10
+            ),
+            ft.Row(
+                controls=[
+                    search_field,
+                    ft.IconButton(icon=ft.Icons.SEARCH, on_click=lambda e: show_search_view(search_field.value))
+                ],
                 spacing=10
             )
         ]
@@ -410,106 +512,122 @@ def main_game(page: ft.Page):
         content=order_info_content
     )
 
-    def update_quantity(index, new_value):
-        if new_value < 1:
-            new_value = 1
-        processed_orders[index]["qty"] = new_value
-        update_right_panel()
+    # 右パネルの行（商品 id → OrderRow）。変更のあった行のテキストだけを書き換える
+    order_rows = {}
 
-    # --- update_right_panel 関数内の変更 ---
-    def update_right_panel():
-        nonlocal operator_total
-        order_list.controls.clear()
-        operator_total = 0
-        for i, item in enumerate(processed_orders):
-            total_item = item["price"] * item["qty"]
-            operator_total += total_item
-            # 既存の処理（各行の生成）
-            raw_path = os.path.join("assets", "images", item["image"])
-            image_path = raw_path.replace("\\", "/")
-            order_list.controls.append(
-                ft.Row(
-                    controls=[
-                        ft.Image(src=image_path, width=40, height=40, fit="contain"),
-                        ft.Text(item["name"]),
-                        ft.Text(f"{item['price']}円"),
-                        ft.IconButton(icon=ft.Icons.REMOVE, on_click=lambda e, i=i: update_quantity(i, processed_orders[i]["qty"] - 1)),
-                        ft.Text(f"{item['qty']}"),
-                        ft.IconButton(icon=ft.Icons.ADD, on_click=lambda e, i=i: update_quantity(i, processed_orders[i]["qty"] + 1)),
-                        ft.Text(f"計: {total_item}円"),
-                        ft.IconButton(icon=ft.Icons.DELETE, on_click=lambda e, i=i: delete_order(i))
-                    ],
-                    spacing=10
-                )
-            )
-        total_display.value = f"商品合計: {operator_total}円"
-        # 支払情報の表示を、注文内容が一致したときだけ行う
-        order_payment_info.visible = is_orders_matching(customer_order, processed_orders)
-        page.update()
+    @perf.timed("refresh_totals")
+    def refresh_totals():
+        total_display.value = f"商品合計: {round_state.cart.total}円"
+        total_display.update()
+        # 支払情報の表示を、注文内容が一致したときだけ行う（表示が切り替わるときだけ送る）
+        matching = round_state.matching
+        if order_payment_info.visible != matching:
+            order_payment_info.visible = matching
+            order_payment_info.update()
+
+    @perf.timed("change_quantity")
+    def change_quantity(product_id, delta):
+        get_recorder(page).cart_qty(product_id, delta)
+        if not round_state.cart_qty(product_id, delta):
+            return
+        order_rows[product_id].refresh()
+        refresh_totals()
 
-    def delete_order(index):
-        del processed_orders[index]
-        update_right_panel()
+    @perf.timed("delete_order")
+    def delete_order(product_id):
+        get_recorder(page).cart_delete(product_id)
+        row = order_rows.pop(product_id)
+        round_state.cart_delete(product_id)
+        order_list.controls.remove(row.control)
+        order_list.update()
+        refresh_totals()
 
+    @perf.timed("add_order")
     def add_order(e, order):
-        nonlocal operator_total
-        for proc in processed_orders:
-            if proc["name"] == order["name"]:
-                proc["qty"] += 1
-                break
-        else:
-            new_order = order.copy()
-            new_order["qty"] = 1
-            processed_orders.append(new_order)
+        get_recorder(page).cart_add(order["id"])
         play_sound("click.mp3")
-        update_right_panel()
+        line = round_state.cart_add(order)
+        row = order_rows.get(line.id)
+        if row is not None:
+            row.refresh()
+        else:
+            row = OrderRow(line, change_quantity, delete_order)
+            order_rows[line.id] = row
+            order_list.controls.append(row.control)
+            order_list.update()
+        refresh_totals()
 
     # show_category_view を新たな View として実装
-    def show_category_view(category: str):
-        play_sound("click3.mp3")
-        conn = sqlite3.connect("flet_app.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, price, image FROM line_list WHERE genre = ?", (category,))
-        items = [{"name": row[0], "price": row[1], "image": row[2]} for row in cursor.fetchall()]
-        conn.close()
-
-        controls = []
-        if items:
-            for item in items:
-                # 画像はプロジェクト内の assets/images フォルダに配置
-                image_path = os.path.join("assets", "images", item["image"])
-                controls.append(
-                    ft.Container(
-                        expand=True,
-                        content=ft.Column(
-                            [
-                                ft.Image(src=image_path, width=80, height=80, fit="contain"),
-                                ft.Text(item["name"], size=14, weight="bold"),
-                                ft.Text(f"{item['price']}円", size=12),
-                                ft.IconButton(
-                                    icon=ft.Icons.ADD,
-                                    on_click=lambda e, order=item: (add_order(e, order), page.views.pop(), page.go("/"))
-                                )
-                            ],
-                            alignment="center"
-                        ),
-                        
-                        width=120,
-                        padding=5,
-                        margin=5,
-                        bgcolor=ft.Colors.GREY_50,
-                        border_radius=5,
-                        border=ft.border.all(1, ft.Colors.GREY_300)
+    def product_tile(item: dict):
+        # 画像はプロジェクト内の assets/images フォルダに配置（表示は 80px 用のサムネイル）
+        image_path = thumbnail_src(item["image"], 80)
+        return ft.Container(
+            expand=True,
+            content=ft.Column(
+                [
+                    ft.Image(src=image_path, width=80, height=80, fit="contain"),
+                    ft.Text(item["name"], size=14, weight="bold"),
+                    ft.Text(f"{item['price']}円", size=12),
+                    ft.IconButton(
+                        icon=ft.Icons.ADD,
+                        on_click=lambda e, order=item: (add_order(e, order), page.views.pop(), page.go("/"))
                     )
-                )
-        else:
-            controls.append(ft.Text("該当する商品はありません。"))
+                ],
+                alignment="center"
+            ),
+
+            width=120,
+            padding=5,
+            margin=5,
+            bgcolor=ft.Colors.GREY_50,
+            border_radius=5,
+            border=ft.border.all(1, ft.Colors.GREY_300)
+        )
+
+    def show_product_grid(title: str, route: str, load_page):
+        """
+        商品一覧の画面を開く。load_page(カーソル) が返す (商品リスト, 次のカーソル) を 1 ページとして、
+        最初のページだけを表示し、スクロールが末尾に近づいたら次のページを追加する
+        """
+        play_sound("click3.mp3")
+        next_cursor = None
+        loading = threading.Lock()
+        grid = ft.GridView(
+            expand=True,
+            runs_count=4,
+            spacing=10,
+            run_spacing=10,
+            on_scroll_interval=100,
+        )
+
+        def load_next_page():
+            nonlocal next_cursor
+            items, next_cursor = load_page(next_cursor)
+            grid.controls.extend(product_tile(item) for item in items)
 
-        category_view = ft.View(
-            route="/" + category,
+        def on_scroll(e: ft.OnScrollEvent):
+            if next_cursor is None or e.pixels < e.max_scroll_extent - 200:
+                return
+            # スクロールイベントは連続して届くため、読み込み中の重複実行を防ぐ
+            if not loading.acquire(blocking=False):
+                return
+            try:
+                if next_cursor is not None:
+                    load_next_page()
+                    grid.update()
+            finally:
+                loading.release()
+
+        load_next_page()
+        if not grid.controls:
+            grid.controls.append(ft.Text("該当する商品はありません。"))
+        grid.on_scroll = on_scroll
+
+        product_view = ft.View(
+            route=route,
             controls=[
                 ft.AppBar(
-                    title=ft.Text(f"{category} 一覧"),
+                    title=ft.Text(title),
                     bgcolor=ft.Colors.GREY_200,
                     leading=ft.IconButton(
                         icon=ft.Icons.ARROW_BACK,
@@ -517,148 +635,125 @@ def main_game(page: ft.Page):
                     )
                 ),
                 ft.Container(
-                    content=ft.GridView(
-                        expand=True,
-                        runs_count=4,
-                        spacing=10,
-                        run_spacing=10,
-                        controls=controls
-                    ),
+                    content=grid,
                     padding=10,
                     bgcolor=ft.Colors.WHITE,
-                    border_radius=10
+                    border_radius=10,
+                    expand=True
                 )
             ],
             horizontal_alignment="center",
             vertical_alignment="start"
         )
-        page.views.append(category_view)
-        page.go(category_view.route)
+        page.views.append(product_view)
+        page.go(product_view.route)
+
+    @perf.timed("show_category_view")
+    def show_category_view(category: str):
+        # ジャンルの商品は CATEGORY_PAGE_SIZE 件ずつ読み込む
+        catalog = get_catalog()
+        show_product_grid(
+            f"{category} 一覧",
+            "/" + category,
+            lambda cursor: catalog.genre_page(category, cursor, CATEGORY_PAGE_SIZE)
+        )
+
+    @perf.timed("show_search_view")
+    def show_search_view(query: str):
+        query = query.strip()
+        if not query:
+            return
+        results = get_catalog().search(query, limit=SEARCH_LIMIT)
+        show_product_grid(f"「{query}」の検索結果", "/search", lambda cursor: (results, None))
+
+    # コイン画像ボタンの定義（assets/coins フォルダ内の画像を利用）
+    coins = [
+        {"value": 1, "img": "1yen.png"},
+        {"value": 5, "img": "5yen.png"},
+        {"value": 10, "img": "10yen.png"},
+        {"value": 50, "img": "50yen.png"},
+        {"value": 100, "img": "100yen.png"},
+        {"value": 500, "img": "500yen.png"},
+        {"value": 1000, "img": "1000yen.png"},
+        {"value": 5000, "img": "5000yen.png"},
+    ]
 
     # ----- 修正: coin_stack の定義（背景色なし、サイズ固定も指定しない） -----
-    coin_stack_controls = []  # コインの画像を格納するリスト
+    # 額面ごとに 1 つの画像＋枚数バッジを持つお釣り置き場（タップのたびに画像を増やさない）
+    coin_tray = CoinTray([coin["value"] for coin in coins])
+    # お釣りに使える額面（大きい順）。枚数の評価とヒントはこの額面での最少枚数を基準にする
+    change_denominations = tuple(sorted((coin["value"] for coin in coins), reverse=True))
+
+    def change_hint(amount: int) -> str:
+        return format_breakdown(get_change_table(change_denominations).breakdown(amount))
     coin_stack = ft.Container(
         expand=True,
-        alignment=ft.alignment.top_right
+        alignment=ft.alignment.top_right,
+        content=coin_tray.control
     )
-    # ----- 追加: お客が怒ったかを判定するフラグ(初期はFalse) -----
-    customer_angry_triggered = False
-
-    # ----- 修正: 右上に積むコイン画像用の更新関数 -----
-    def update_coin_stack():
-        # 追加順の反転せず、追加された順番そのままで下から上に積む（最初のコインが一番下）
-        coin_stack.content = ft.Column(
-            controls=coin_stack_controls,
-            spacing=-65,  # オフセットはお好みで調整
-            alignment=ft.MainAxisAlignment.END
-        )
-        page.update()
 
     # コイン画像タップ時の処理
+    @perf.timed("coin_click")
     def coin_click(e, coin):
-        nonlocal numeric_input, customer_angry_triggered
-        global global_lives
-        numeric_input += coin["value"]
-        numeric_display.value = f"{numeric_input} 円"
-        coin_stack_controls.append(
-            ft.Image(
-                src=os.path.join("assets", "coins", f"{coin['value']}yentumu.png").replace("\\", "/"),
-                width=80,
-                height=80,
-                fit="contain"
-            )
-        )
-        update_coin_stack()
-        play_sound("coin.mp3")
+        tapped_at = time.perf_counter()
+        get_recorder(page).coin_tap(coin["value"])
+        if round_state.answered:
+            return  # 結果の演出中はお釣り置き場を変えない（次の問題まで入力を受け付けない）
+        # 音は画面更新より先に鳴らし、タップに遅れないようにする
+        play_sound("coin.mp3", tapped_at)
+        outcome = round_state.coin_tap(coin["value"])
+        numeric_display.value = f"{round_state.numeric_input} 円"
+        # 変わったのは合計表示とタップされた額面の枠だけなので、その 2 つだけを送る
+        page.update(numeric_display, coin_tray.add(coin["value"]))
         
-        # お釣りが23枚を超え、まだ怒り処理が未実行の場合
-        if not customer_angry_triggered and len(coin_stack_controls) > 23:
-            customer_angry_triggered = True
-            global_lives -= 1
+        # お釣りが ANGRY_COIN_LIMIT (23) 枚を超えて客が怒った場合
+        if outcome is not None:
+            # 怒らせた時点でこの問題は終了（カウントダウンも止める）
+            calc_button.disabled = True
+            countdown.cancel()
+            state = round_state.state
+            get_recorder(page).round_end(outcome, state.score)
             update_life_icons()
             
             # angry 状態のGIF（oikari2.gif と killyou.gif）を表示
-            top_stack.controls = [
-                ft.Container(
-                    expand=True,
-                    alignment=ft.Alignment(-0.4, -0.4),
-                    content=ft.Image(
-                        src="assets/gifs/oikari2.gif",
-                        width=450,
-                        height=350,
-                        fit="contain"
-                    )
-                ),
-                ft.Container(
-                    expand=True,
-                    alignment=ft.Alignment(0, -0.4),
-                    content=ft.Image(
-                        src="assets/gifs/killyou.gif",
-                        width=359,
-                        height=350,
-                        fit="contain"
-                    )
-                )
-            ]
+            show_layers(angry_layers)
             page.update()
             
             # 1秒後に punch.mp3 と grass.mp3 を再生し、その直後に画面全体で punch.gif を表示
             def show_punch():
-                top_stack.controls = [
-                    ft.Container(
-                        expand=True,
-                        alignment=ft.alignment.center,
-                        content=ft.Image(
-                            src="assets/gifs/punch.gif",
-                            width=page.window_width,
-                            height=page.window_height,
-                            fit="contain"
-                        )
-                    )
-                ]
+                show_layers(punch_layers)
                 page.update()
-                if global_lives <= 0:
-                    threading.Timer(2, game_over).start()
+                if state.over:
+                    scheduler.call_later(2, game_over)
                 else:
-                    threading.Timer(2, lambda: main_game(page)).start()
+                    scheduler.call_later(2, next_round, page)
             
             def play_sounds_and_show_punch():
                 play_sound("punch.mp3")
                 play_sound("grass.mp3")
                 show_punch()
             
-            threading.Timer(1, play_sounds_and_show_punch).start()
+            scheduler.call_later(1, play_sounds_and_show_punch)
 
     # 入力クリア用ボタンの処理
+    @perf.timed("clear_coin")
     def clear_coin(e):
-        nonlocal numeric_input
-        numeric_input = 0
-        numeric_display.value = f"{numeric_input} 円"
-        coin_stack_controls.clear()
-        update_coin_stack()
+        get_recorder(page).clear_coins()
+        round_state.clear_coins()
+        numeric_display.value = f"{round_state.numeric_input} 円"
+        coin_tray.reset()
         play_sound("click.mp3")
-        page.update()
+        page.update(numeric_display, coin_tray.control)
 
     # 釣りなしボタンの処理（numeric_input を 0 にリセット）
+    @perf.timed("zero_change")
     def zero_change(e):
-        nonlocal numeric_input
-        numeric_input = 0
+        get_recorder(page).zero_change()
+        round_state.zero_change()
         numeric_display.value = "0 円"
         play_sound("click.mp3")
         page.update()
 
-    # コイン画像ボタンの定義（assets/coins フォルダ内の画像を利用）
-    coins = [
-        {"value": 1, "img": "1yen.png"},
-        {"value": 5, "img": "5yen.png"},
-        {"value": 10, "img": "10yen.png"},
-        {"value": 50, "img": "50yen.png"},
-        {"value": 100, "img": "100yen.png"},
-        {"value": 500, "img": "500yen.png"},
-        {"value": 1000, "img": "1000yen.png"},
-        {"value": 5000, "img": "5000yen.png"},
-    ]
-
     coin_keys = ft.Column([
         ft.Row(
             controls=[
@@ -680,73 +775,82 @@ def main_game(page: ft.Page):
         ft.ElevatedButton("釣りなし", on_click=zero_change, width=80)  # 釣りなしボタンを追加
     ])
 
+    def on_ranking_saved(future, final_score, message):
+        # 書き込みスレッドから呼ばれる。コミットされたら順位（集計表と索引から求める）を表示に加える
+        if future.exception() is not None:
+            print(f"ランキングの保存に失敗しました: {future.exception()}")
+            return
+        rank, total = get_rank(final_score)
+        daily_best = get_daily_best()
+        # ホーム画面に戻った後や次のゲームが始まった後は書き換えない
+        if change_display.value != message:
+            return
+        change_display.value = f"{message}（{total} 件中 {rank} 位）"
+        if daily_best is not None and final_score >= daily_best[0]:
+            change_display.value += " 本日のベスト！"
+        change_display.update()
+
+    @perf.timed("game_over")
     def game_over():
-        global global_score, global_lives
-        final_score = global_score  # 累積した global_score をそのまま最終スコアとして使用
-        change_display.value = f"ゲームオーバ！ 最終スコア: {final_score} 円"
+        final_score = get_game_state(page).score  # このセッションで累積した得点をそのまま最終スコアとして使用
+        message = f"ゲームオーバ！ 最終スコア: {final_score} 円"
+        get_recorder(page).game_over(final_score)
+        close_recorder(page)
+        change_display.value = message
         page.update()
-        record_ranking(final_score)
-        # 3秒後にゲームリセットしてホーム画面へ戻る処理
+        # 書き込みはバックグラウンドの書き込みスレッドに任せ、画面はコミットを待たない
+        get_write_queue().record_ranking(final_score).add_done_callback(
+            lambda future: on_ranking_saved(future, final_score, message))
+        # 3秒後にホーム画面へ戻る処理（得点とライフは次のゲーム開始時に main_game で初期化する）
         def restart():
-            global global_lives, global_score
-            global_lives = 3
-            global_score = 0
             print("Game over. Restarting...")
             home_view(page)
             print("Game over. Restarting...")
-        threading.Timer(3, restart).start()
-
-    answered = False  # この問題で既に回答済みかチェックするフラグ
+        scheduler.call_later(3, restart)
 
     # 会計処理（calculate_change）内：お釣りが0円の場合も正しく判定
+    @perf.timed("calculate_change")
     def calculate_change(e):
-        nonlocal numeric_input, simulated_payment, order_sum, operator_total, answered
-        global global_score, global_lives
-        if answered:
+        get_recorder(page).checkout()
+        outcome = round_state.checkout()
+        if outcome is None:
             return  # 既に回答済みなら何もしない
-        answered = True
+        countdown.cancel()
         calc_button.disabled = True
         page.update()
 
         play_sound("cash.mp3")
-        correct_change = simulated_payment - order_sum
-
-        order_match = is_orders_matching(customer_order, processed_orders)
-        error_occurred = False
+        state = round_state.state
+        numeric_input = round_state.numeric_input
+        correct_change = round_state.correct_change
+        get_recorder(page).round_end(outcome, state.score)
 
-        if not order_match:
-            global_lives -= 1
-            change_display.value = f"注文ミス！ 残りライフ: {global_lives}"
-            error_occurred = True
-            # ライフが減少したとき、上部GIFを gif2.gif に変更
-            top_gif.src = "assets/gifs/oikari2.gif"
-            top_gif.width = 450
-            top_gif.height = 350
-        elif numeric_input != correct_change:
-            global_lives -= 1
-            change_display.value = f"支払いミス！ 正しいお釣りは {correct_change} 円です。 残りライフ: {global_lives}"
-            error_occurred = True
-            # ライフが減少したとき、上部GIFを gif2.gif に変更
-            top_gif.src = "assets/gifs/oikari2.gif"
-            top_gif.width = 450
-            top_gif.height = 350
+        if outcome == ORDER_MISTAKE:
+            change_display.value = f"注文ミス！ 残りライフ: {state.lives}"
+            show_angry_face()
+        elif outcome == CHANGE_MISTAKE:
+            change_display.value = (f"支払いミス！ 正しいお釣りは {correct_change} 円（{change_hint(correct_change)}）です。 "
+                                    f"残りライフ: {state.lives}")
+            show_angry_face()
         else:
             play_sound("correct.mp3")
-            change_display.value = f"正解！ お釣り: {numeric_input} 円"
-            global_score += operator_total
+            grade, optimal = grade_efficiency(numeric_input, round_state.coins, change_denominations)
+            change_display.value = f"正解！ お釣り: {numeric_input} 円（{round_state.coins} 枚 {grade}）"
+            if round_state.coins > optimal:
+                change_display.value += f" 最少は {optimal} 枚: {change_hint(numeric_input)}"
             page.update()
             # 正解の場合は2秒後に次の注文へ
-            threading.Timer(2, lambda: main_game(page)).start()
+            scheduler.call_later(2, next_round, page)
             return
 
         # ライフ表示の更新
         update_life_icons()
         page.update()
-        if global_lives <= 0:
+        if state.over:
             game_over()
         else:
             # 誤答だがライフが残っている場合も2秒後に次の注文へ
-            threading.Timer(2, lambda: main_game(page)).start()
+            scheduler.call_later(2, next_round, page)
 
     calc_button = ft.ElevatedButton("会計", on_click=calculate_change)
     input_info = ft.Column(
@@ -771,20 +875,6 @@ def main_game(page: ft.Page):
         content=input_info
     )
 
-    # 画面全体の背景を茶色にするため、下部領域を包むコンテナは bgcolor="brown"
-    main_content = ft.Container(
-        #expand=True,
-        bgcolor="brown",
-        padding=10,
-        content=ft.Row(
-            controls=[
-                ft.Container(content=order_info, expand=True, padding=10),
-                ft.VerticalDivider(width=1),
-                ft.Container(content=input_info_container, expand=True, padding=10)
-            ]
-        )
-    )
-
     # 全体を下寄せにするため、Column で包みます
     main_view = ft.View(
         route="/",
@@ -842,8 +932,60 @@ def main_game(page: ft.Page):
             )
         ]
     )
-    page.views.append(main_view)
-    page.go("/")
+
+    def reset_round(order, payment, paid_coins):
+        """
+        新しい問題に切り替える。客の注文欄だけを作り直し、入力内容・カウンタ・演出を初期状態に戻す
+        """
+        nonlocal round_state, countdown_remaining, countdown
+        round_state = RoundState(order, payment, get_game_state(page))
+        customer_order = round_state.customer_order
+
+        customer_order_list.controls = [
+            ft.Row(
+                controls=[
+                    ft.Image(src=thumbnail_src(item["image"], 50), width=50, height=50, fit="contain"),
+                    ft.Text(f"{item['name']}  {item['price']}円", size=16),
+                    ft.Text(f"数量: {item['qty']}")
+                ],
+                spacing=10
+            )
+            for item in customer_order
+        ]
+        payment_text.value = f"支払い金額　　　{payment}円"
+        payment_breakdown_text.value = "内訳　" + "、".join(f"{d}円×{c}" for d, c in paid_coins.items())
+        order_payment_info.visible = False
+
+        # 入力内容のリセット
+        order_rows.clear()
+        order_list.controls.clear()
+        search_field.value = ""
+        total_display.value = "商品合計: 0円"
+        numeric_display.value = ""
+        coin_tray.reset()
+        calc_button.disabled = False
+        change_display.value = "お釣り: "
+
+        # 上部の演出とタイマー・ライフ表示のリセット
+        top_gif.src = effect_src("idle")
+        top_gif.width = 300
+        top_gif.height = 350
+        show_layers(idle_layers)
+        countdown_remaining = round_seconds
+        timer_widget.value = f"{countdown_remaining}秒"
+        timer_widget.color = None
+        update_life_icons()
+
+        if len(page.views) == 1 and page.views[0] is main_view:
+            page.update()
+        else:
+            # ホーム画面・カテゴリ画面などから戻る場合だけ View を載せ替える
+            page.views.clear()
+            page.views.append(main_view)
+            page.go("/")
+        countdown = scheduler.start_countdown(round_seconds, update_countdown, on_timeout)
+
+    return reset_round
 
 import sys
 def resource_path(relative_path):
@@ -863,11 +1005,52 @@ def main(page: ft.Page):
     page.scroll = "auto"
     page.title = "レジ打ちゲーム"
     page.window.icon = resource_path("icon.ico")
-    # BGMを再生
-    play_bgm("background_music.mp3")
-
-    home_view(page)
     page.bgcolor = ft.Colors.ORANGE_100
 
+    # ホーム画面を先に表示し、重い初期化はその後にバックグラウンドで行う
+    # （BGM は音声の初期化が終わりしだい home_view で指定した曲が流れる）
+    with profile.phase("home_view: ホーム画面の構築・送信"):
+        home_view(page)
+    profile.mark("first frame: ホーム画面を送信")
+    perf.attach(page)  # --perf 指定時のみ: 画面更新の時間の記録と、F2 でのパフォーマンス表示
+    # ブラウザとの接続が切れたら、遊んでいる途中のゲームの記録を閉じる（--record 指定時のみ記録している）
+    page.on_disconnect = lambda e: close_recorder(page)
+    start_warm_up()
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+def warm_up():
+    """
+    音声（pygame・効果音のデコード）、DB（カタログ・スキーマ）、演出ファイルの初期化を行う。
+    どれもホーム画面の表示には不要なので、表示後にバックグラウンドで実行する。
+    1 つの処理が失敗しても（音声デバイスが無い場合など）エラーを表示して残りの処理を続ける。
+    """
+    phases = [
+        ("audio: pygame の初期化と効果音のデコード", sound_bank.start),
+        ("db: スキーマ確認", initialize_scores_db),
+        ("db: 商品カタログの読み込み", lambda: get_catalog().refresh()),
+        ("effects: 演出ファイルの確認・変換", prepare_effects),
+    ]
+    for name, func in phases:
+        try:
+            with profile.phase(name):
+                func()
+        except Exception as ex:
+            print(f"起動時の初期化に失敗しました（{name}）: {ex!r}")
+    profile.report()
+
+def start_warm_up():
+    # Web モードでは複数のセッションから呼ばれるため、プロセスにつき一度だけ実行する
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=warm_up, daemon=True).start()
+
 
-ft.app(target=main, assets_dir="assets")
+if __name__ == "__main__":
+    # python main.py --startup-profile で起動すると、起動処理ごとの時間を表示する
+    # python main.py --perf で起動すると、操作ごとの処理時間を計測する（F2 で表示、終了時に perf_report.json へ書き出し）
+    ft.app(target=main, assets_dir="assets")
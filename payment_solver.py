@@ -0,0 +1,88 @@
+def _split_counts(available: dict) -> list:
+    """
+    各額面の個数を二進分割し、(額面, 枚数) の組のリストにする。
+    例: 100円が 5 枚 → (100, 1), (100, 2), (100, 2)
+    こうすることで k 枚の硬貨を k 回ではなく約 log2(k) 回の処理で扱える。
+    """
+    parts = []
+    for denom in sorted(available.keys(), reverse=True):
+        remaining = available[denom]
+        k = 1
+        while remaining > 0:
+            take = min(k, remaining)
+            parts.append((denom, take))
+            remaining -= take
+            k *= 2
+    return parts
+
+
+def _reachable(order_sum: int, available: dict, history: list = None) -> int:
+    """
+    支払い可能な金額の集合をビット列（bit s が立っていれば s 円を支払える）で返す。
+    history にリストを渡すと、分割ごとの途中結果を追記する。
+    """
+    # 最小の支払額は order_sum + (最大額面) 未満に必ず収まるため、それより上のビットは捨てる
+    limit = max(order_sum, 0) + max(available)
+    mask = (1 << limit) - 1
+    reach = 1
+    if history is not None:
+        history.append(reach)
+    for denom, count in _split_counts(available):
+        reach = (reach | (reach << (denom * count))) & mask
+        if history is not None:
+            history.append(reach)
+    return reach
+
+
+def _lowest_at_or_above(reach: int, order_sum: int):
+    """
+    reach の中で order_sum 以上の最小の金額を返す（無ければ None）
+    """
+    start = max(order_sum, 0)
+    candidates = reach >> start
+    if candidates == 0:
+        return None
+    return start + (candidates & -candidates).bit_length() - 1
+
+
+def min_payment(order_sum: int, available: dict) -> int:
+    """
+    solve_payment の金額だけを求める版（内訳の復元を省くため速い）
+    """
+    available = {d: c for d, c in available.items() if d > 0 and c > 0}
+    if not available:
+        return order_sum
+    amount = _lowest_at_or_above(_reachable(order_sum, available), order_sum)
+    return order_sum if amount is None else amount
+
+
+def solve_payment(order_sum: int, available: dict):
+    """
+    available: {コイン額面: 個数, ...}
+    order_sum 以上で支払える最小額と、そのときに支払うコインの内訳
+    {額面: 枚数}（額面の大きい順）を返す。
+
+    支払い可能な金額の集合を Python の整数のビット列で表し、
+    二進分割した硬貨ごとにシフトと OR で更新する（有界個数の部分和問題）。
+    支払えない場合は (order_sum, {}) を返す。
+    """
+    available = {d: c for d, c in available.items() if d > 0 and c > 0}
+    if not available:
+        return order_sum, {}
+    parts = _split_counts(available)
+    history = []  # history[i]: 先頭 i 個の分割を使って作れる金額の集合
+    amount = _lowest_at_or_above(_reachable(order_sum, available, history), order_sum)
+    if amount is None:
+        return order_sum, {}
+
+    # 後ろから復元：分割 i を使わずに作れるならスキップ、作れないなら使う
+    coins = {}
+    target = amount
+    for i in range(len(parts), 0, -1):
+        if (history[i - 1] >> target) & 1:
+            continue
+        denom, count = parts[i - 1]
+        coins[denom] = coins.get(denom, 0) + count
+        target -= denom * count
+    coins = {d: coins[d] for d in sorted(coins, reverse=True)}
+    return amount, coins
@@ -0,0 +1,321 @@
+"""
+操作（イベントハンドラ）ごとの処理時間の計測と、ゲーム画面に重ねて表示するパフォーマンス表示。
+python main.py --perf で起動したとき（Web モードなどで引数を渡せない場合は環境変数 REGI_PERF=1）だけ有効になり、
+無効のときは timed() がハンドラをそのまま返すので、計測による負担は無い。
+
+- ハンドラの処理時間: イベントを受け取ってから page.update() で画面の更新を送り終えるまで
+  （ブラウザ側で押されてから届くまでの通信時間は含まない）
+- frame: page.update() 1 回（コントロールの差分の作成と送信）にかかった時間
+- loop_lag: パフォーマンス表示を更新するタイマーが予定より遅れた時間（イベントループが詰まっている目安）
+
+時間は処理ごとのヒストグラム（対数の幅の区間ごとの回数）に記録するので、何回呼ばれてもメモリは増えない。
+終了時に perf_report.json へ書き出し、python perf.py perf_report.json で一覧を表示できる。
+ゲーム中は F2 でパフォーマンス表示の表示・非表示を切り替え、F3 でその時点の結果を書き出す。
+"""
+import atexit
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+EXPORT_PATH = "perf_report.json"
+TOGGLE_KEY = "F2"
+EXPORT_KEY = "F3"
+OVERLAY_INTERVAL = 0.5  # パフォーマンス表示を更新する間隔 [秒]
+
+# ヒストグラムの区間: 0.05ms から 1.25 倍ずつ広げた 64 区間（約 0.05ms 〜 80 秒）。最後の区間はそれ以上すべて
+BUCKET_MIN = 0.00005
+BUCKET_GROWTH = 1.25
+BUCKET_COUNT = 64
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def bucket_upper(index: int, bucket_min: float = BUCKET_MIN) -> float:
+    """
+    最初の区間の上限が bucket_min のときの、区間 index の上限 [秒]
+    """
+    return bucket_min * BUCKET_GROWTH ** index
+
+
+class LatencyHistogram:
+    """
+    処理時間の分布。区間ごとの回数と、回数・合計・最大値だけを持つ。
+    percentile() は該当する区間の上限を返すので、実際の値との差は区間の幅（25%）以内になる。
+    bucket_min より短い時間はすべて最初の区間に入るので、µs 単位の処理を測る場合は bucket_min を小さくし、
+    同じ上限まで届くよう bucket_count を増やす（replay.py の再生時間など）
+    """
+
+    __slots__ = ("counts", "count", "total", "max", "bucket_min")
+
+    def __init__(self, bucket_min: float = BUCKET_MIN, bucket_count: int = BUCKET_COUNT):
+        self.bucket_min = bucket_min
+        self.counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        if seconds <= self.bucket_min:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1, math.ceil(math.log(seconds / self.bucket_min) / _LOG_GROWTH))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper(index, self.bucket_min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.mean * 1000,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p90_ms": self.percentile(0.9) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+            # 回数が 0 でない区間だけを {区間の上限 [ms]: 回数} で残す
+            "buckets": {f"{bucket_upper(i, self.bucket_min) * 1000:.4g}": n for i, n in enumerate(self.counts) if n},
+        }
+
+
+class PerfMonitor:
+    """
+    処理名ごとの LatencyHistogram をまとめて持つ（プロセスで 1 つ。Web モードでは全セッション分の合計になる）
+    """
+
+    def __init__(self, enabled: bool, export_path: str = EXPORT_PATH):
+        self.enabled = enabled
+        self.export_path = export_path
+        self._histograms = {}
+        self._reports = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = LatencyHistogram()
+                self._histograms[name] = histogram
+            histogram.record(seconds)
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """
+        ハンドラの処理時間を name で記録するデコレータ（無効のときは関数をそのまま返す）
+        """
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def add_report(self, name: str, func):
+        """
+        ヒストグラム以外の計測結果を name で載せる。func は {項目: 値} の dict を返す関数で、
+        パフォーマンス表示の更新と書き出しのたびに呼ばれる（効果音の遅延など、他のモジュールが集計しているもの）
+        """
+        with self._lock:
+            self._reports[name] = func
+
+    def reports(self) -> dict:
+        """
+        add_report で登録した名前 → func() の結果（失敗したものはエラーの文字列）
+        """
+        with self._lock:
+            reports = dict(self._reports)
+        results = {}
+        for name, func in reports.items():
+            try:
+                results[name] = func()
+            except Exception as ex:
+                results[name] = {"error": repr(ex)}
+        return results
+
+    def snapshot(self) -> dict:
+        """
+        処理名 → LatencyHistogram.to_dict() の結果（処理名の順）
+        """
+        with self._lock:
+            return {name: self._histograms[name].to_dict() for name in sorted(self._histograms)}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def export(self, path: str = None) -> str:
+        """
+        計測結果を JSON で書き出し、書き出したパスを返す
+        """
+        path = path or self.export_path
+        report = {
+            "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._started)),
+            "exported_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+            "bucket_min_ms": BUCKET_MIN * 1000,
+            "bucket_growth": BUCKET_GROWTH,
+            "handlers": self.snapshot(),
+            "reports": self.reports(),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp_path, path)
+        return path
+
+    def attach(self, page):
+        """
+        ページ（セッション）に計測を組み込む: page.update() の時間を frame として記録し、
+        F2 / F3 キーでパフォーマンス表示の切り替えと書き出しができるようにする（無効のときは何もしない）
+        """
+        if not self.enabled or page.session.get("perf_overlay") is not None:
+            return
+        overlay = PerfOverlay(self, page)
+        page.session.set("perf_overlay", overlay)
+        update = page.update
+
+        def timed_update(*controls):
+            start = time.perf_counter()
+            try:
+                return update(*controls)
+            finally:
+                self.record("frame", time.perf_counter() - start)
+
+        page.update = timed_update
+        page.on_keyboard_event = overlay.on_keyboard
+        page.overlay.append(overlay.control)
+        update()
+
+
+class PerfOverlay:
+    """
+    画面の右上に重ねて表示する処理時間の一覧（p50 / p99 / 最大 [ms]）
+    """
+
+    def __init__(self, monitor: PerfMonitor, page):
+        import flet as ft  # 計測を有効にしたときだけ使うので、ここで import する
+
+        self.monitor = monitor
+        self.page = page
+        self._update = page.update  # 自分の表示更新は frame に数えないよう、計測前の update を使う
+        self.text = ft.Text("", font_family="monospace", size=12, color=ft.Colors.WHITE)
+        self.control = ft.Container(
+            content=self.text,
+            bgcolor=ft.Colors.with_opacity(0.75, ft.Colors.BLACK),
+            padding=8,
+            border_radius=6,
+            right=10,
+            top=10,
+            visible=False,
+        )
+        self._running = False
+
+    def on_keyboard(self, e):
+        if e.key == TOGGLE_KEY:
+            self.toggle()
+        elif e.key == EXPORT_KEY:
+            print(f"パフォーマンスの計測結果を書き出しました: {self.monitor.export()}")
+
+    def toggle(self):
+        self.control.visible = not self.control.visible
+        self.render()
+        if self.control.visible and not self._running:
+            self._running = True
+            self.page.run_task(self._refresh_loop)
+
+    async def _refresh_loop(self):
+        import asyncio
+
+        try:
+            while self.control.visible:
+                expected = time.perf_counter() + OVERLAY_INTERVAL
+                await asyncio.sleep(OVERLAY_INTERVAL)
+                self.monitor.record("loop_lag", max(0.0, time.perf_counter() - expected))
+                if self.control.visible:
+                    self.render()
+        finally:
+            self._running = False
+
+    def render(self):
+        lines = [f"{'処理':<20}{'回数':>6}{'p50':>8}{'p99':>8}{'最大':>8}"]
+        for name, stats in self.monitor.snapshot().items():
+            lines.append(f"{name:<20}{stats['count']:>6}{stats['p50_ms']:>8.1f}"
+                         f"{stats['p99_ms']:>8.1f}{stats['max_ms']:>8.1f}")
+        for name, stats in self.monitor.reports().items():
+            lines.append(f"{name}: {format_stats(stats)}")
+        lines.append(f"[ms]  {TOGGLE_KEY}: 表示切替  {EXPORT_KEY}: 書き出し")
+        self.text.value = "\n".join(lines)
+        self._update(self.control)
+
+
+def format_stats(stats: dict) -> str:
+    """
+    add_report の結果を「項目 値」を並べた 1 行にする（小数は 2 桁）
+    """
+    return "  ".join(f"{key} {value:.2f}" if isinstance(value, float) else f"{key} {value}"
+                     for key, value in stats.items())
+
+
+def print_report(path: str = EXPORT_PATH):
+    """
+    書き出した計測結果を一覧で表示する
+    """
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    print(f"---- perf report ({report['started_at']} 〜 {report['exported_at']}) [ms] ----")
+    print(f"{'処理':<24} {'回数':>7} {'平均':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'最大':>8}")
+    for name, stats in report["handlers"].items():
+        print(f"{name:<24} {stats['count']:>7} {stats['mean_ms']:>8.2f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p90_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+    for name, stats in report.get("reports", {}).items():
+        print(f"{name}: {format_stats(stats)}")
+
+
+perf = PerfMonitor("--perf" in sys.argv or os.environ.get("REGI_PERF") == "1")
+
+
+def _export_at_exit():
+    if perf.enabled and perf.snapshot():
+        print(f"パフォーマンスの計測結果を書き出しました: {perf.export()}")
+
+
+atexit.register(_export_at_exit)
+
+
+if __name__ == "__main__":
+    print_report(sys.argv[1] if len(sys.argv) > 1 else EXPORT_PATH)
@@ -0,0 +1,151 @@
+"""
+session_log で記録したプレイを、画面（flet）なしで最高速で再生する。
+問題は記録した乱数の種から deal_round で作り直し、入力はゲーム画面のハンドラと同じ game_engine.RoundState のメソッドに順に渡す
+（画面の更新・音・演出の分は含まない）。
+各問題の結果と得点を記録と照らし合わせ、違っていれば「不一致」として表示する（ルールや商品一覧が変わった場合など）。
+イベントごとの処理時間を集計するので、実際のプレイをそのままベンチマークや遅い操作の再現に使える。
+
+使い方（リポジトリのルートで実行）:
+    python replay.py recordings/session-*.rec            # 記録を再生して結果と処理時間を表示する
+    python replay.py recordings/session-*.rec --repeat 20
+"""
+import argparse
+import time
+
+from catalog import get_catalog
+from game_engine import GameState, RoundState, deal_round, OUTCOMES
+from perf import LatencyHistogram
+from session_log import (
+    read_session, catalog_fingerprint, EVENT_NAMES, GAME_START, ROUND_START, COIN_TAP, CART_ADD, CART_QTY,
+    CART_DELETE, CLEAR_COINS, ZERO_CHANGE, CHECKOUT, TIMEOUT as TIMEOUT_EVENT, ROUND_END, GAME_OVER,
+)
+from storage import DB_PATH
+
+SLOWEST_EVENTS = 10  # 処理に時間がかかったイベントを何件表示するか
+# 再生は 1 イベントが数 µs で終わるため、perf の既定（0.05ms から）より細かい 1µs からの区間で集計する
+# （84 区間で約 100 秒まで）
+REPLAY_BUCKET_MIN = 0.000001
+REPLAY_BUCKET_COUNT = 84
+
+
+def replay_events(events, items) -> dict:
+    """
+    read_session で読んだイベントを順に再生する。戻り値:
+        histograms: イベントの種類名 → LatencyHistogram（1 イベントの処理時間）
+        mismatches: 記録と結果が違った問題の [(イベント番号, 問題の種, 記録の (結果, 得点), 再生の (結果, 得点))]
+        slowest: 処理に時間がかかったイベントの [(秒, イベント番号, 種類名, 問題の種)]（遅い順）
+        rounds / games / elapsed（再生にかかった秒数）
+    """
+    by_id = {item["id"]: item for item in items}
+    histograms = {name: LatencyHistogram(REPLAY_BUCKET_MIN, REPLAY_BUCKET_COUNT) for name in EVENT_NAMES.values()}
+    mismatches = []
+    slowest = []
+    state = GameState()
+    current = None
+    seed = None
+    rounds = games = 0
+    timer = time.perf_counter
+    started = timer()
+    for index, (kind, _, *args) in enumerate(events):
+        start = timer()
+        if kind == GAME_START:
+            state = GameState()
+            current = None
+            games += 1
+        elif kind == ROUND_START:
+            seed = args[0]
+            customer_order, payment, _, _ = deal_round(items, seed)
+            current = RoundState(customer_order, payment, state)
+            rounds += 1
+        elif current is None:
+            pass  # 問題が始まる前の入力（記録の途中から読んだ場合など）は無視する
+        elif kind == COIN_TAP:
+            current.coin_tap(args[0])
+        elif kind == CART_ADD:
+            current.cart_add(by_id[args[0]])
+        elif kind == CART_QTY:
+            current.cart_qty(args[0], args[1])
+        elif kind == CART_DELETE:
+            current.cart_delete(args[0])
+        elif kind == CLEAR_COINS:
+            current.clear_coins()
+        elif kind == ZERO_CHANGE:
+            current.zero_change()
+        elif kind == CHECKOUT:
+            current.checkout()
+        elif kind == TIMEOUT_EVENT:
+            current.timeout()
+        elif kind == ROUND_END:
+            expected = (OUTCOMES[args[0]], args[1])
+            actual = (current.outcome, state.score)
+            if expected != actual:
+                mismatches.append((index, seed, expected, actual))
+        elif kind == GAME_OVER:
+            if args[0] != state.score:
+                mismatches.append((index, seed, ("game_over", args[0]), ("game_over", state.score)))
+        seconds = timer() - start
+        name = EVENT_NAMES[kind]
+        histograms[name].record(seconds)
+        if len(slowest) < SLOWEST_EVENTS or seconds > slowest[-1][0]:
+            slowest.append((seconds, index, name, seed))
+            slowest.sort(reverse=True)
+            del slowest[SLOWEST_EVENTS:]
+    return {
+        "histograms": {name: h for name, h in histograms.items() if h.count},
+        "mismatches": mismatches,
+        "slowest": slowest,
+        "rounds": rounds,
+        "games": games,
+        "elapsed": timer() - started,
+    }
+
+
+def replay_file(path: str, items=None) -> dict:
+    """
+    記録ファイルを再生する。items を省略すると DB の商品カタログを使う
+    """
+    header, events = read_session(path)
+    items = items if items is not None else get_catalog().snapshot()
+    if header["fingerprint"] and header["fingerprint"] != catalog_fingerprint(items):
+        print(f"{path}: 記録したときと商品一覧が違います（問題が同じにならず、不一致になる場合があります）")
+    result = replay_events(events, items)
+    result["events"] = len(events)
+    result["recorded_seconds"] = events[-1][1] / 1e6 if events else 0.0
+    return result
+
+
+def report(path: str, result: dict):
+    events = result["events"]
+    print(f"{path}: {result['games']} ゲーム, {result['rounds']} 問, {events} イベント "
+          f"(記録 {result['recorded_seconds']:.1f} 秒 → 再生 {result['elapsed'] * 1000:.1f} ms, "
+          f"{events / max(result['elapsed'], 1e-9):,.0f} イベント/秒)")
+    print(f"{'イベント':<14} {'回数':>7} {'平均 [µs]':>10} {'p50':>8} {'p99':>8} {'最大':>8}")
+    for name, histogram in result["histograms"].items():
+        print(f"{name:<14} {histogram.count:>7} {histogram.mean * 1e6:>10.1f} {histogram.percentile(0.5) * 1e6:>8.1f} "
+              f"{histogram.percentile(0.99) * 1e6:>8.1f} {histogram.max * 1e6:>8.1f}")
+    print("処理に時間がかかったイベント:")
+    for seconds, index, name, seed in result["slowest"]:
+        print(f"  #{index:<6} {name:<14} {seconds * 1e6:>9.1f} µs  問題の種 {seed}")
+    if result["mismatches"]:
+        print(f"記録と結果が違う問題: {len(result['mismatches'])} 件")
+        for index, seed, expected, actual in result["mismatches"][:SLOWEST_EVENTS]:
+            print(f"  #{index} 問題の種 {seed}: 記録 {expected} / 再生 {actual}")
+    else:
+        print("すべての問題で記録と同じ結果になりました")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録したプレイを画面なしで再生する")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--db", default=DB_PATH, help="商品カタログを読む DB")
+    parser.add_argument("--repeat", type=int, default=1, help="同じ記録を続けて再生する回数（処理時間は最後の回を表示）")
+    args = parser.parse_args()
+    items = get_catalog(args.db).snapshot()
+    for path in args.paths:
+        for _ in range(args.repeat):
+            result = replay_file(path, items)
+        report(path, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import asyncio
+import math
+import threading
+import time
+
+
+class ScheduledHandle:
+    """
+    GameScheduler に登録した処理の取り消し用ハンドル
+    """
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self._future = None
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        まだ実行されていなければ取り消す（実行済み・取り消し済みなら何もしない）
+        """
+        self.cancelled = True
+        if self._future is not None:
+            self._future.cancel()
+        self._scheduler._discard(self)
+
+
+class GameScheduler:
+    """
+    ゲーム画面の時間経過処理（カウントダウン、演出の待ち時間、次の問題への遷移）を
+    ページのイベントループ上の asyncio タスクとしてまとめて管理する。
+    threading.Timer のように毎回スレッドを作らず、cancel_all() で前の問題の処理を一括で取り消せる。
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._handles = set()
+        self._lock = threading.Lock()
+
+    def _add(self, handle):
+        with self._lock:
+            self._handles.add(handle)
+
+    def _discard(self, handle):
+        with self._lock:
+            self._handles.discard(handle)
+
+    def _start(self, handle, coro_func, *args):
+        self._add(handle)
+        handle._future = self.page.run_task(coro_func, handle, *args)
+        # run_task の戻り値を受け取る前に cancel() された場合も確実に止める
+        if handle.cancelled:
+            handle._future.cancel()
+        return handle
+
+    def call_later(self, delay: float, callback, *args) -> ScheduledHandle:
+        """
+        delay 秒後に callback(*args) をイベントループ上で実行する
+        """
+        return self._start(ScheduledHandle(self), self._run_later, delay, callback, args)
+
+    async def _run_later(self, handle, delay, callback, args):
+        await asyncio.sleep(delay)
+        if handle.cancelled:
+            return
+        # callback の中で cancel_all() が呼ばれても自分自身を取り消さないよう、先に登録を外す
+        self._discard(handle)
+        callback(*args)
+
+    def start_countdown(self, seconds: int, on_tick, on_expire) -> ScheduledHandle:
+        """
+        seconds 秒のカウントダウンを開始する。
+        残り秒数が変わるたびに on_tick(残り秒数) を呼び、0 になったら on_expire() を呼ぶ。
+        残り時間は開始時刻からの経過（time.monotonic）で計算するため、処理の遅れが積み重ならない。
+        """
+        deadline = time.monotonic() + seconds
+        return self._start(ScheduledHandle(self), self._run_countdown, deadline, on_tick, on_expire)
+
+    async def _run_countdown(self, handle, deadline, on_tick, on_expire):
+        shown = None
+        while not handle.cancelled:
+            remaining = deadline - time.monotonic()
+            seconds_left = max(0, math.ceil(remaining))
+            if seconds_left != shown:
+                shown = seconds_left
+                on_tick(seconds_left)
+            if remaining <= 0:
+                self._discard(handle)
+                on_expire()
+                return
+            # 次に表示が切り替わる時刻（残り秒数が 1 減る時刻）まで待つ（on_tick にかかった時間も差し引く）
+            await asyncio.sleep(max(0, deadline - (seconds_left - 1) - time.monotonic()))
+
+    def cancel_all(self):
+        """
+        登録中の処理をすべて取り消す（問題の切り替え時や画面遷移時に呼ぶ）
+        """
+        with self._lock:
+            handles = list(self._handles)
+        for handle in handles:
+            handle.cancel()
+
+
+def get_scheduler(page) -> GameScheduler:
+    """
+    ページ（セッション）ごとの GameScheduler を返す
+    """
+    scheduler = page.session.get("scheduler")
+    if scheduler is None:
+        scheduler = GameScheduler(page)
+        page.session.set("scheduler", scheduler)
+    return scheduler
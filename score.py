@@ -1,23 +1,13 @@
-import sqlite3
 import time
 
-DB_PATH = "flet_app.db"
+from storage import DB_PATH, ensure_schema, transaction
 
 def initialize_scores_db(db_path: str = DB_PATH):
     """
-    スコア記録用テーブルが存在しなければ作成する
+    スコア記録用テーブルが存在しなければ作成する（テーブル定義は storage.SCHEMA にまとめてある）
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS scores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            score INTEGER,
-            timestamp TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction(db_path) as conn:
+        ensure_schema(conn)
 '''
 def initialize_ranking_db(db_path: str = DB_PATH):
     """
@@ -49,35 +39,58 @@ def calculate_score(correct: bool, time_taken: float, base_score: int = 100) ->
     score = max(10, base_score - penalty)
     return score
 
+def current_timestamp() -> str:
+    """
+    scores / ranking の timestamp 列に記録する現在時刻
+    """
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
 def record_score(score: int, db_path: str = DB_PATH):
     """
     スコアと現在時刻を DB に記録する
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    c.execute("INSERT INTO scores (score, timestamp) VALUES (?, ?)", (score, timestamp))
-    conn.commit()
-    conn.close()
+    timestamp = current_timestamp()
+    with transaction(db_path) as conn:
+        conn.execute("INSERT INTO scores (score, timestamp) VALUES (?, ?)", (score, timestamp))
 
 def record_ranking(score: int, db_path: str = DB_PATH):
     """
     ゲーム終了時の最終スコアをランキングテーブルに記録する
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    c.execute("INSERT INTO ranking (score, timestamp) VALUES (?, ?)", (score, timestamp))
-    conn.commit()
-    conn.close()
+    timestamp = current_timestamp()
+    with transaction(db_path) as conn:
+        conn.execute("INSERT INTO ranking (score, timestamp) VALUES (?, ?)", (score, timestamp))
 
 def get_rankings(limit: int = 10, db_path: str = DB_PATH):
     """
-    ランキング上位のエントリを取得する
+    ランキング上位のエントリを取得する（limit=None で全件）
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("SELECT score, timestamp FROM ranking ORDER BY score DESC LIMIT ?", (limit,))
-    rankings = c.fetchall()
-    conn.close()
-    return rankings
\ No newline at end of file
+    with transaction(db_path) as conn:
+        # SQLite では LIMIT -1 が件数制限なしを表す
+        rankings = conn.execute(
+            "SELECT score, timestamp FROM ranking ORDER BY score DESC LIMIT ?",
+            (-1 if limit is None else limit,)
+        ).fetchall()
+    return rankings
+
+def get_rankings_page(after=None, limit: int = 50, db_path: str = DB_PATH):
+    """
+    ランキングを score の高い順に limit 件ずつ取得する（keyset ページング）。
+    after には前回返されたカーソルを渡す（最初のページは None）。
+    戻り値は ([(score, timestamp), ...], 次のページのカーソル)。最後のページではカーソルが None になる。
+    OFFSET を使わないため、何ページ目でも索引をたどるだけで取得できる。
+    """
+    with transaction(db_path) as conn:
+        if after is None:
+            rows = conn.execute(
+                "SELECT id, score, timestamp FROM ranking ORDER BY score DESC, id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, score, timestamp FROM ranking WHERE (score, id) < (?, ?) "
+                "ORDER BY score DESC, id DESC LIMIT ?",
+                (after[0], after[1], limit)
+            ).fetchall()
+    next_cursor = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+    return [(row[1], row[2]) for row in rows], next_cursor
@@ -0,0 +1,242 @@
+"""
+プレイの記録（セッションログ）。問題ごとの乱数の種と、コインのタップ・カートの操作・会計などの入力を、
+操作の間隔（time.monotonic_ns による µs 単位の差分）とともに小さなバイナリで書き出す。
+python main.py --record で起動したとき（Web モードなどで引数を渡せない場合は環境変数 REGI_RECORD=1）だけ記録する。
+ファイルはゲーム 1 回ごとに作り、ゲームオーバーかブラウザとの接続が切れた時点で閉じる。
+記録したファイルは replay.py で画面なしに最高速で再生でき、実際のプレイをベンチマークや不具合の再現に使える。
+
+ファイルの形式（リトルエンディアン）:
+    ヘッダ: HEADER（マジック, 版, 記録開始時刻 [UNIX 秒], 商品一覧の指紋）
+    イベント: 種類 (u8), 前のイベントからの経過 [µs] (u32), 種類ごとの引数（EVENT_FORMATS）
+"""
+import atexit
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from game_engine import OUTCOMES
+
+MAGIC = b"REGS"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxdI")
+RECORDINGS_DIR = "recordings"
+
+# イベントの種類
+GAME_START = 1
+ROUND_START = 2  # 引数: 問題の乱数の種
+COIN_TAP = 3  # 引数: 額面
+CART_ADD = 4  # 引数: 商品 id
+CART_QTY = 5  # 引数: 商品 id, 数量の増減
+CART_DELETE = 6  # 引数: 商品 id
+CLEAR_COINS = 7
+ZERO_CHANGE = 8
+CHECKOUT = 9
+TIMEOUT = 10
+ROUND_END = 11  # 引数: 結果（OUTCOME_CODES）, その時点の得点
+GAME_OVER = 12  # 引数: 最終スコア
+
+EVENT_NAMES = {
+    GAME_START: "game_start", ROUND_START: "round_start", COIN_TAP: "coin_tap", CART_ADD: "cart_add",
+    CART_QTY: "cart_qty", CART_DELETE: "cart_delete", CLEAR_COINS: "clear_coins", ZERO_CHANGE: "zero_change",
+    CHECKOUT: "checkout", TIMEOUT: "timeout", ROUND_END: "round_end", GAME_OVER: "game_over",
+}
+_PAYLOADS = {ROUND_START: "Q", COIN_TAP: "i", CART_ADD: "i", CART_QTY: "ib", CART_DELETE: "i", ROUND_END: "Bq",
+             GAME_OVER: "q"}
+EVENT_FORMATS = {kind: struct.Struct("<BI" + _PAYLOADS.get(kind, "")) for kind in EVENT_NAMES}
+_PREFIX = struct.Struct("<BI")
+# 結果の文字列と、ログに書く番号の対応（game_engine.OUTCOMES の並び）
+OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+_MAX_DELTA = 0xFFFFFFFF  # 約 71 分。それ以上間が空いた場合はこの値で記録する
+
+
+def catalog_fingerprint(items) -> int:
+    """
+    商品一覧（id・価格）の指紋。記録時と再生時で商品一覧が違うと同じ種でも違う問題になるため、確認に使う
+    """
+    checksum = 0
+    for item in items:
+        checksum = zlib.crc32(f"{item['id']}:{item['price']};".encode(), checksum)
+    return checksum
+
+
+class SessionRecorder:
+    """
+    1 セッション分のイベントを 1 つのファイルに書き出す。
+    ハンドラは複数のスレッドから呼ばれるため、書き込みはロックで順番に行う。
+    ファイルへの書き出しは 1 問が終わるたび（ROUND_END）とゲーム終了時にまとめて行う。
+    """
+
+    enabled = True
+
+    def __init__(self, path: str, fingerprint: int = 0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time(), fingerprint))
+        self._last = time.monotonic_ns()
+
+    def _write(self, kind: int, *args):
+        with self._lock:
+            if self._file is None:
+                return
+            now = time.monotonic_ns()
+            delta = min((now - self._last) // 1000, _MAX_DELTA)
+            self._last = now
+            self._file.write(EVENT_FORMATS[kind].pack(kind, delta, *args))
+            if kind in (ROUND_END, GAME_OVER):
+                self._file.flush()
+
+    def game_start(self):
+        self._write(GAME_START)
+
+    def round_start(self, seed: int):
+        self._write(ROUND_START, seed)
+
+    def coin_tap(self, value: int):
+        self._write(COIN_TAP, value)
+
+    def cart_add(self, product_id: int):
+        self._write(CART_ADD, product_id)
+
+    def cart_qty(self, product_id: int, delta: int):
+        self._write(CART_QTY, product_id, delta)
+
+    def cart_delete(self, product_id: int):
+        self._write(CART_DELETE, product_id)
+
+    def clear_coins(self):
+        self._write(CLEAR_COINS)
+
+    def zero_change(self):
+        self._write(ZERO_CHANGE)
+
+    def checkout(self):
+        self._write(CHECKOUT)
+
+    def timeout(self):
+        self._write(TIMEOUT)
+
+    def round_end(self, outcome: str, score: int):
+        self._write(ROUND_END, OUTCOME_CODES[outcome], score)
+
+    def game_over(self, score: int):
+        self._write(GAME_OVER, score)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _DisabledRecorder(SessionRecorder):
+    """
+    記録しないときに使う、何もしない SessionRecorder
+    """
+
+    enabled = False
+
+    def __init__(self):
+        pass
+
+    def _write(self, kind: int, *args):
+        pass
+
+    def close(self):
+        pass
+
+
+_DISABLED = _DisabledRecorder()
+_enabled = "--record" in sys.argv or os.environ.get("REGI_RECORD") == "1"
+_recorders = []
+_recorders_lock = threading.Lock()
+_counter = 0
+
+
+def start_recorder(page, items=()) -> SessionRecorder:
+    """
+    ページ（セッション）で始まるゲーム 1 回分の記録ファイルを開き、その SessionRecorder を返す
+    （ゲーム開始時に呼ぶ。前のゲームの記録が開いたままなら閉じる）。記録しない設定のときは何もしない recorder を返す。
+    items（商品一覧）の指紋をファイルに記録する
+    """
+    if not _enabled:
+        return _DISABLED
+    close_recorder(page)
+    global _counter
+    with _recorders_lock:
+        _counter += 1
+        name = f"session-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{_counter}.rec"
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    recorder = SessionRecorder(os.path.join(RECORDINGS_DIR, name), catalog_fingerprint(items))
+    with _recorders_lock:
+        _recorders.append(recorder)
+    page.session.set("recorder", recorder)
+    return recorder
+
+
+def get_recorder(page) -> SessionRecorder:
+    """
+    ページ（セッション）で記録中の SessionRecorder を返す。
+    記録しない設定のときや、ゲームが始まっていない（ゲームオーバー・切断で閉じた後）ときは何もしない recorder を返す
+    """
+    if not _enabled:
+        return _DISABLED
+    return page.session.get("recorder") or _DISABLED
+
+
+def close_recorder(page):
+    """
+    ページ（セッション）の記録を書き出して閉じる（ゲームオーバー時と、ブラウザとの接続が切れたときに呼ぶ）
+    """
+    recorder = page.session.get("recorder")
+    if recorder is None:
+        return
+    page.session.remove("recorder")
+    with _recorders_lock:
+        if recorder in _recorders:
+            _recorders.remove(recorder)
+    recorder.close()
+
+
+def close_all():
+    """
+    開いているすべての記録を書き出して閉じる（終了時に自動で呼ばれる）
+    """
+    with _recorders_lock:
+        recorders = list(_recorders)
+        _recorders.clear()
+    for recorder in recorders:
+        recorder.close()
+
+
+atexit.register(close_all)
+
+
+def read_session(path: str):
+    """
+    記録を読み込み、(ヘッダの dict, イベントのリスト) を返す。
+    イベントは (種類, 記録開始からの経過 [µs], 引数...) のタプル。書き込み途中で終わっている最後のイベントは捨てる
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, started_at, fingerprint = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} はセッションの記録ではないか、対応していない版です")
+    events = []
+    offset = HEADER.size
+    elapsed = 0
+    while offset + _PREFIX.size <= len(data):
+        kind = data[offset]
+        fmt = EVENT_FORMATS.get(kind)
+        if fmt is None:
+            raise ValueError(f"{path}: 不明なイベントの種類 {kind}（位置 {offset}）")
+        if offset + fmt.size > len(data):
+            break
+        _, delta, *args = fmt.unpack_from(data, offset)
+        elapsed += delta
+        events.append((kind, elapsed, *args))
+        offset += fmt.size
+    return {"started_at": started_at, "fingerprint": fingerprint}, events
@@ -0,0 +1,222 @@
+"""
+game_engine のルールで、決まった癖を持つプレイヤー（ScriptedPlayer）にゲームを大量に遊ばせ、
+最終スコアと失敗の内訳の分布を表示する（難易度調整やルール変更の確認用）。
+ゲームは複数プロセスに分けて並列に実行する。同じ --seed なら、プロセス数によらず同じ結果になる。
+
+使い方（リポジトリのルートで実行）:
+    python simulate.py --games 100000 --player average
+    python simulate.py --games 10000 --order-error-rate 0.1 --workers 4
+"""
+import argparse
+import os
+import random
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog import get_catalog
+from currency import coin_count
+from game_engine import (
+    generate_order, simulate_payment, grade_round, round_points, order_total, GameState,
+    OUTCOMES, CORRECT, TIMEOUT, TOO_MANY_COINS, ANGRY_COIN_LIMIT, DENOMINATIONS,
+)
+from storage import DB_PATH
+
+CHUNK_GAMES = 500  # 1 回のプロセス間のやり取りで遊ぶゲーム数
+
+
+class ScriptedPlayer:
+    """
+    シミュレーション用のプレイヤー。各問題で次の確率で失敗する。
+    timeout_rate: 時間切れになる
+    order_error_rate: 注文の入力を間違える（数量の誤り・商品の入れ忘れ・余計な商品）
+    change_error_rate: お釣りの金額を 1 枚分間違える
+    お釣りは大きい額面から渡すため、枚数が ANGRY_COIN_LIMIT を超えると客が怒る。
+    """
+
+    __slots__ = ("timeout_rate", "order_error_rate", "change_error_rate")
+
+    def __init__(self, timeout_rate: float = 0.0, order_error_rate: float = 0.0, change_error_rate: float = 0.0):
+        self.timeout_rate = timeout_rate
+        self.order_error_rate = order_error_rate
+        self.change_error_rate = change_error_rate
+
+    def answer(self, rng, items, customer_order, payment: int):
+        """
+        (入力した注文, 入力したお釣り) を返す。時間切れの場合は None
+        """
+        if rng.random() < self.timeout_rate:
+            return None
+        processed_orders = [item.copy() for item in customer_order]
+        if rng.random() < self.order_error_rate:
+            _make_order_mistake(rng, items, processed_orders)
+        numeric_input = payment - order_total(customer_order)
+        if rng.random() < self.change_error_rate:
+            d = rng.choice(DENOMINATIONS)
+            numeric_input = numeric_input - d if numeric_input >= d and rng.random() < 0.5 else numeric_input + d
+        return processed_orders, numeric_input
+
+
+def _make_order_mistake(rng, items, processed_orders):
+    kind = rng.randrange(3)
+    if kind == 0:
+        # 数量の誤り
+        item = rng.choice(processed_orders)
+        item["qty"] += 1 if item["qty"] == 1 or rng.random() < 0.5 else -1
+    elif kind == 1 and len(processed_orders) > 1:
+        # 商品の入れ忘れ
+        processed_orders.pop(rng.randrange(len(processed_orders)))
+    else:
+        # 注文に無い商品を入れる
+        names = {item["name"] for item in processed_orders}
+        extra = [item for item in items if item["name"] not in names]
+        if extra:
+            order = rng.choice(extra).copy()
+            order["qty"] = 1
+            processed_orders.append(order)
+        else:
+            processed_orders[0]["qty"] += 1
+
+
+PLAYERS = {
+    "perfect": ScriptedPlayer(),
+    "expert": ScriptedPlayer(timeout_rate=0.005, order_error_rate=0.01, change_error_rate=0.01),
+    "average": ScriptedPlayer(timeout_rate=0.02, order_error_rate=0.05, change_error_rate=0.08),
+    "beginner": ScriptedPlayer(timeout_rate=0.05, order_error_rate=0.15, change_error_rate=0.2),
+}
+
+
+def play_round(rng, items, player: ScriptedPlayer, state: GameState) -> str:
+    """
+    1 問分（注文の生成 → 支払い → プレイヤーの回答 → 判定）を実行し、結果を state に反映して返す
+    """
+    customer_order = generate_order(items, rng)
+    payment, _, _ = simulate_payment(order_total(customer_order), rng)
+    answer = player.answer(rng, items, customer_order, payment)
+    if answer is None:
+        outcome, points = TIMEOUT, 0
+    else:
+        processed_orders, numeric_input = answer
+        if coin_count(numeric_input) > ANGRY_COIN_LIMIT:
+            outcome, points = TOO_MANY_COINS, 0
+        else:
+            outcome, _ = grade_round(customer_order, processed_orders, numeric_input, payment)
+            points = round_points(outcome, processed_orders)
+    state.apply(outcome, points)
+    return outcome
+
+
+def play_game(rng, items, player: ScriptedPlayer, max_rounds: int) -> tuple:
+    """
+    ライフが無くなるか max_rounds 問に達するまで遊び、(最終スコア, 問題数, 結果ごとの回数) を返す
+    """
+    state = GameState()
+    outcomes = Counter()
+    while not state.over and state.rounds < max_rounds:
+        outcomes[play_round(rng, items, player, state)] += 1
+    return state.score, state.rounds, outcomes
+
+
+def _run_chunk(args):
+    items, player, seed, start, count, max_rounds = args
+    scores = array("q")
+    rounds = array("l")
+    outcomes = Counter()
+    for game in range(start, start + count):
+        # ゲームごとに乱数を分けるので、どのプロセスで実行しても同じ結果になる
+        rng = random.Random(seed * 1_000_003 + game)
+        score, n, game_outcomes = play_game(rng, items, player, max_rounds)
+        scores.append(score)
+        rounds.append(n)
+        outcomes.update(game_outcomes)
+    return scores, rounds, outcomes
+
+
+def run_simulation(items, player: ScriptedPlayer, games: int, seed: int = 0, max_rounds: int = 200,
+                   workers: int = None) -> dict:
+    """
+    games ゲームをプロセスプールで並列に遊ばせ、スコア・問題数・結果の内訳を返す。
+    workers=1 のときはプロセスを作らずにこのプロセスで実行する。
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [(items, player, seed, start, min(CHUNK_GAMES, games - start), max_rounds)
+              for start in range(0, games, CHUNK_GAMES)]
+    scores = array("q")
+    rounds = array("l")
+    outcomes = Counter()
+    if workers == 1:
+        results = map(_run_chunk, chunks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_run_chunk, chunks)
+    try:
+        for chunk_scores, chunk_rounds, chunk_outcomes in results:
+            scores.extend(chunk_scores)
+            rounds.extend(chunk_rounds)
+            outcomes.update(chunk_outcomes)
+    finally:
+        if workers != 1:
+            executor.shutdown()
+    return {"scores": scores, "rounds": rounds, "outcomes": outcomes}
+
+
+def _percentiles(values) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    stats = {label: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+             for label, q in (("p10", 0.1), ("p50", 0.5), ("p90", 0.9), ("p99", 0.99))}
+    stats["mean"] = sum(ordered) / len(ordered)
+    stats["max"] = ordered[-1]
+    return stats
+
+
+def report(result: dict, elapsed: float):
+    scores = result["scores"]
+    total_rounds = sum(result["rounds"])
+    outcomes = result["outcomes"]
+    print(f"ゲーム数: {len(scores)}, 問題数: {total_rounds}, "
+          f"所要時間: {elapsed:.1f} 秒 ({total_rounds / max(elapsed, 1e-9):,.0f} 問/秒)")
+    for title, stats in (("最終スコア", _percentiles(scores)), ("問題数 / ゲーム", _percentiles(result["rounds"]))):
+        print(f"{title}: " + ", ".join(f"{k}={v:,.1f}" if isinstance(v, float) else f"{k}={v:,}"
+                                        for k, v in stats.items()))
+    print("結果の内訳:")
+    for outcome in OUTCOMES:
+        count = outcomes[outcome]
+        print(f"  {outcome:<15} {count:>12,} ({count / max(total_rounds, 1):7.2%})")
+    mistakes = total_rounds - outcomes[CORRECT]
+    if mistakes:
+        print("失敗の内訳:")
+        for outcome in OUTCOMES:
+            if outcome != CORRECT and outcomes[outcome]:
+                print(f"  {outcome:<15} {outcomes[outcome] / mistakes:7.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ゲームのルールを使った大量シミュレーション")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--player", choices=sorted(PLAYERS), default="average")
+    parser.add_argument("--timeout-rate", type=float)
+    parser.add_argument("--order-error-rate", type=float)
+    parser.add_argument("--change-error-rate", type=float)
+    parser.add_argument("--max-rounds", type=int, default=200, help="1 ゲームの問題数の上限（失敗しないプレイヤー用）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数（省略時は CPU コア数）")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    base = PLAYERS[args.player]
+    player = ScriptedPlayer(
+        timeout_rate=base.timeout_rate if args.timeout_rate is None else args.timeout_rate,
+        order_error_rate=base.order_error_rate if args.order_error_rate is None else args.order_error_rate,
+        change_error_rate=base.change_error_rate if args.change_error_rate is None else args.change_error_rate,
+    )
+    items = get_catalog(args.db).all_items()
+    started = time.perf_counter()
+    result = run_simulation(items, player, args.games, args.seed, args.max_rounds, args.workers)
+    report(result, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
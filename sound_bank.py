@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+SOUNDS_DIR = os.path.join("assets", "sounds")
+BGM_PREFIX = "bgm"  # bgm*.mp3 は長いので起動時にはデコードせず、初回再生時に読み込む
+DEFAULT_BUFFER = 256
+BUFFER_OPTION = "--sound-buffer"
+BUFFER_ENV = "REGI_SOUND_BUFFER"
+
+
+def configured_buffer(argv=None, environ=None) -> int:
+    """
+    ミキサーのバッファサンプル数の設定。python main.py --sound-buffer 512 で起動したとき
+    （Web モードなどで引数を渡せない場合は環境変数 REGI_SOUND_BUFFER=512）はその値、指定が無ければ DEFAULT_BUFFER。
+    音切れする環境では大きく、遅延を詰めたい環境では小さくする
+    """
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    value = environ.get(BUFFER_ENV)
+    for i, arg in enumerate(argv):
+        if arg == BUFFER_OPTION and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith(BUFFER_OPTION + "="):
+            value = arg.split("=", 1)[1]
+    if value is None:
+        return DEFAULT_BUFFER
+    try:
+        buffer = int(value)
+    except ValueError:
+        buffer = 0
+    if buffer <= 0:
+        print(f"効果音のバッファサイズが不正です（{value!r}）。{DEFAULT_BUFFER} を使います")
+        return DEFAULT_BUFFER
+    return buffer
+
+
+class SoundBank:
+    """
+    効果音をまとめて管理するクラス。
+    起動時に assets/sounds の効果音を一度だけデコードしておき、再生時はチャンネルに渡すだけにする。
+    BGM は予約チャンネル 0 で、効果音は残りの固定数のチャンネルで再生する。
+    pygame の読み込みと初期化は start() まで行わないため、起動直後（start() 前）の効果音は鳴らさず、
+    BGM は start() の完了後に再生する。
+    """
+
+    def __init__(self, sounds_dir: str = SOUNDS_DIR, frequency: int = 44100, buffer: int = DEFAULT_BUFFER,
+                 channels: int = 16, volume: float = 0.1):
+        # buffer はミキサーのバッファサンプル数。小さいほど再生開始までの遅延が短くなる（小さすぎると音切れする）
+        self.sounds_dir = sounds_dir
+        self.frequency = frequency
+        self.buffer = buffer
+        self.channels = channels
+        self.volume = volume
+        self._effects = {}
+        self._bgm = {}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)  # タップから再生開始を指示するまでの時間 [秒]
+        self._pending_bgm = None  # start() 前に再生を指示された BGM
+        self._pygame = None
+        self.started = False
+
+    def start(self):
+        """
+        ミキサーを初期化し、効果音をすべてデコードする
+        """
+        if self.started:
+            return
+        import pygame  # 読み込みに時間がかかるため、初期化するときに import する
+        self._pygame = pygame
+        pygame.mixer.pre_init(self.frequency, -16, 2, self.buffer)
+        pygame.mixer.init()
+        pygame.mixer.set_num_channels(self.channels)
+        pygame.mixer.set_reserved(1)  # チャンネル 0 は BGM 専用
+        for filename in sorted(os.listdir(self.sounds_dir)):
+            if filename.startswith(BGM_PREFIX):
+                continue
+            self._load(filename, self._effects)
+        with self._lock:
+            self.started = True
+            pending, self._pending_bgm = self._pending_bgm, None
+        if pending is not None:
+            self.play_bgm(pending)
+
+    def _load(self, filename: str, cache: dict):
+        with self._lock:
+            sound = cache.get(filename)
+            if sound is None:
+                sound = self._pygame.mixer.Sound(os.path.join(self.sounds_dir, filename))
+                sound.set_volume(self.volume)
+                cache[filename] = sound
+            return sound
+
+    def play(self, filename: str, tapped_at: float = None):
+        """
+        効果音を再生する。tapped_at に操作時刻（time.perf_counter()）を渡すと遅延を記録する
+        """
+        if not self.started:
+            return
+        try:
+            sound = self._effects.get(filename) or self._load(filename, self._effects)
+            # 空きチャンネルが無ければ一番古い再生を止めて使う
+            channel = self._pygame.mixer.find_channel(True)
+            channel.play(sound)
+        except Exception as ex:
+            print(f"Error playing sound: {ex}")
+            return
+        if tapped_at is not None:
+            self._latencies.append(time.perf_counter() - tapped_at)
+
+    def play_bgm(self, filename: str):
+        """
+        BGM を予約チャンネルでループ再生する
+        """
+        with self._lock:
+            if not self.started:
+                self._pending_bgm = filename
+                return
+        try:
+            sound = self._load(filename, self._bgm)
+            self._pygame.mixer.Channel(0).play(sound, loops=-1)
+        except Exception as ex:
+            print(f"Error playing BGM: {ex}")
+
+    def stop_bgm(self):
+        with self._lock:
+            if not self.started:
+                self._pending_bgm = None
+                return
+        self._pygame.mixer.Channel(0).stop()
+
+    def output_latency(self) -> float:
+        """
+        ミキサーのバッファ 1 つ分の再生遅延 [秒]（実際に初期化された設定から計算する）
+        """
+        init = self._pygame.mixer.get_init() if self.started else None
+        frequency = init[0] if init else self.frequency
+        return self.buffer / frequency
+
+    def latency_stats(self) -> dict:
+        """
+        タップから音が出るまでの遅延の目安を返す [ミリ秒]。
+        dispatch_*: タップから再生開始を指示するまで、total_*: それにバッファ分の遅延を加えたもの
+        """
+        samples = sorted(self._latencies)
+        buffer_ms = self.output_latency() * 1000
+        stats = {"samples": len(samples), "buffer_ms": buffer_ms}
+        if samples:
+            for label, q in (("p50", 0.5), ("p99", 0.99)):
+                value = samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+                stats[f"dispatch_{label}_ms"] = value
+                stats[f"total_{label}_ms"] = value + buffer_ms
+        return stats
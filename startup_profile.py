@@ -0,0 +1,53 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# このモジュールを最初に import した時刻を起動時刻とみなす（main.py の先頭で import する）
+_START = time.perf_counter()
+
+
+class StartupProfile:
+    """
+    起動時の各処理にかかった時間を記録し、--startup-profile 指定時に一覧を表示する。
+    mark(): 起動からの経過時刻を記録する（ホーム画面の表示完了など）
+    phase(): バックグラウンド初期化などの処理ごとの開始時刻と所要時間を記録する
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._records = []  # (起動からの開始時刻, 所要時間, 名前)
+        self._lock = threading.Lock()
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - _START
+
+    def mark(self, name: str):
+        now = self._elapsed()
+        with self._lock:
+            self._records.append((now, 0.0, name))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = self._elapsed()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._records.append((start, self._elapsed() - start, name))
+
+    def report(self):
+        """
+        記録した時間を起動からの時刻順に表示する（無効時は何もしない）
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            records = sorted(self._records)
+        print("---- startup profile [ms] ----")
+        print(f"{'開始':>9} {'所要':>9}  処理")
+        for start, duration, name in records:
+            print(f"{start * 1000:>9.1f} {duration * 1000:>9.1f}  {name}")
+
+
+profile = StartupProfile("--startup-profile" in sys.argv)
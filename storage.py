@@ -0,0 +1,308 @@
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = "flet_app.db"
+# 商品のジャンル（line_list.genre に入れられる値）
+GENRES = ("コロッケ類", "FF1", "なまもの", "常温", "中華まん", "サラダ", "おにぎり", "飲み物")
+
+# アプリ内のテーブル定義はここで一元管理する（各モジュールで CREATE TABLE しない）
+SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS line_list (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        price INTEGER NOT NULL,
+        genre TEXT NOT NULL CHECK (genre IN ({", ".join(f"'{genre}'" for genre in GENRES)})),
+        image TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS scores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        score INTEGER,
+        timestamp TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ranking (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        score INTEGER,
+        timestamp TEXT
+    )
+    """,
+    # ランキングを上位から keyset ページングで読むための索引（ORDER BY score DESC, id DESC と同じ並び）
+    """
+    CREATE INDEX IF NOT EXISTS idx_ranking_score ON ranking (score DESC, id DESC)
+    """,
+    # ジャンル別の商品一覧を id 順に keyset ページングで読むための索引
+    """
+    CREATE INDEX IF NOT EXISTS idx_line_list_genre ON line_list (genre, id)
+    """,
+]
+
+
+def open_connection(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    WAL モードなどの設定を済ませた新しい接続を返す。
+    通常は transaction() で共有接続を使い、専用の接続が必要な場合（カタログの変更検知など）だけ使う。
+    """
+    # 接続は複数スレッド（Flet のハンドラ・タイマー）で共有するため check_same_thread=False とし、呼び出し側でロックする
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL では NORMAL でもコミット済みデータの整合性は保たれ、コミットごとの fsync を省ける
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# 商品名を一意にする索引（CSV の取り込みで同じ商品を upsert するためのキー）。
+# 以前の取り込みで重複した行が残っていると作れないため、ensure_schema で重複を除いてから作成する
+LINE_LIST_NAME_INDEX = "idx_line_list_name"
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """
+    必要なテーブルと索引が存在しなければ作成する
+    """
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (LINE_LIST_NAME_INDEX,)
+        ).fetchone()
+        if not exists:
+            # 同じ商品名の行は最初に登録された 1 行だけを残す（id が変わらないようにする）
+            conn.execute("DELETE FROM line_list WHERE id NOT IN (SELECT MIN(id) FROM line_list GROUP BY name)")
+            conn.execute(f"CREATE UNIQUE INDEX {LINE_LIST_NAME_INDEX} ON line_list (name)")
+        _ensure_search_index(conn)
+        _ensure_leaderboard(conn)
+
+
+# 商品名の部分一致検索用の全文検索索引（FTS5 の trigram。line_list の変更はトリガーで反映する）
+LINE_LIST_FTS = "line_list_fts"
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE {LINE_LIST_FTS} USING fts5(name, content='line_list', content_rowid='id', tokenize='trigram')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS line_list_fts_insert AFTER INSERT ON line_list BEGIN
+        INSERT INTO {LINE_LIST_FTS} (rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS line_list_fts_delete AFTER DELETE ON line_list BEGIN
+        INSERT INTO {LINE_LIST_FTS} ({LINE_LIST_FTS}, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS line_list_fts_update AFTER UPDATE OF name ON line_list BEGIN
+        INSERT INTO {LINE_LIST_FTS} ({LINE_LIST_FTS}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {LINE_LIST_FTS} (rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+]
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LINE_LIST_FTS,)
+    ).fetchone() is not None
+
+
+def _ensure_search_index(conn: sqlite3.Connection):
+    if has_search_index(conn):
+        return
+    try:
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError as ex:
+        # FTS5（trigram は SQLite 3.34 以降）が使えない環境では索引を作らず、検索は部分一致の走査で行う
+        print(f"商品検索の索引を作成できません（部分一致の走査で検索します）: {ex}")
+        conn.execute(f"DROP TABLE IF EXISTS {LINE_LIST_FTS}")
+        return
+    # 既存の商品を索引に登録する
+    conn.execute(f"INSERT INTO {LINE_LIST_FTS} ({LINE_LIST_FTS}) VALUES ('rebuild')")
+
+
+# ランキングの集計表（日ごと・週ごとの最高点と、得点の分布）。ranking への追加・削除のたびにトリガーで更新するので、
+# 今日の最高点や「何位か」を調べるときに ranking 全体を並べ替えなくて済む。
+# ranking の行は追加と削除だけを行う前提（行を書き換えた場合は rebuild_leaderboard で作り直す）
+HISTOGRAM_WIDTH = 1000  # 得点の分布の区間の幅 [円]（score // HISTOGRAM_WIDTH が区間の番号）
+LEADERBOARD_TABLE = "ranking_histogram"
+# 週は月曜日の日付で表す（'weekday 0' でその週の日曜日に進め、6 日戻す）
+_DAY = "date({row}.timestamp)"
+_WEEK = "date({row}.timestamp, 'weekday 0', '-6 days')"
+
+
+def _best_triggers(table: str, key: str) -> tuple:
+    new_key = key.format(row="new")
+    old_key = key.format(row="old")
+    on_insert = f"""
+        INSERT INTO {table} (period, score, ranking_id, plays) VALUES ({new_key}, new.score, new.id, 1)
+        ON CONFLICT (period) DO UPDATE SET
+            plays = plays + 1,
+            score = MAX(score, excluded.score),
+            ranking_id = CASE WHEN excluded.score > score THEN excluded.ranking_id ELSE ranking_id END;
+    """
+    # その期間の行が無くなったら期間ごと消し、残っていて消した行が最高点だった場合だけ、残りから最高点を選び直す
+    # （先に消しておかないと、選び直しの副問い合わせが NULL を返して score の NOT NULL 制約で DELETE が失敗する）
+    on_delete = f"""
+        UPDATE {table} SET plays = plays - 1 WHERE period = {old_key};
+        DELETE FROM {table} WHERE period = {old_key} AND plays <= 0;
+        UPDATE {table} SET (score, ranking_id) = (
+            SELECT score, id FROM ranking
+            WHERE {key.format(row="ranking")} = {table}.period AND score IS NOT NULL
+            ORDER BY score DESC, id LIMIT 1
+        ) WHERE period = {old_key} AND ranking_id = old.id;
+    """
+    return on_insert, on_delete
+
+
+_daily_insert, _daily_delete = _best_triggers("ranking_daily_best", _DAY)
+_weekly_insert, _weekly_delete = _best_triggers("ranking_weekly_best", _WEEK)
+LEADERBOARD_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ranking_daily_best (
+        period TEXT PRIMARY KEY,  -- 日付 (YYYY-MM-DD)
+        score INTEGER NOT NULL,
+        ranking_id INTEGER NOT NULL,
+        plays INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ranking_weekly_best (
+        period TEXT PRIMARY KEY,  -- その週の月曜日の日付 (YYYY-MM-DD)
+        score INTEGER NOT NULL,
+        ranking_id INTEGER NOT NULL,
+        plays INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {LEADERBOARD_TABLE} (
+        bucket INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ranking_leaderboard_insert AFTER INSERT ON ranking
+    WHEN new.score IS NOT NULL AND date(new.timestamp) IS NOT NULL BEGIN
+        INSERT INTO {LEADERBOARD_TABLE} (bucket, count) VALUES (new.score / {HISTOGRAM_WIDTH}, 1)
+        ON CONFLICT (bucket) DO UPDATE SET count = count + 1;
+        {_daily_insert}
+        {_weekly_insert}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS ranking_leaderboard_delete AFTER DELETE ON ranking
+    WHEN old.score IS NOT NULL AND date(old.timestamp) IS NOT NULL BEGIN
+        UPDATE {LEADERBOARD_TABLE} SET count = count - 1 WHERE bucket = old.score / {HISTOGRAM_WIDTH};
+        DELETE FROM {LEADERBOARD_TABLE} WHERE bucket = old.score / {HISTOGRAM_WIDTH} AND count <= 0;
+        {_daily_delete}
+        {_weekly_delete}
+    END
+    """,
+]
+
+
+def rebuild_leaderboard(conn: sqlite3.Connection):
+    """
+    ランキングの集計表を ranking の内容から作り直す（集計表を作った直後の既存分の登録にも使う）
+    """
+    valid = "score IS NOT NULL AND date(timestamp) IS NOT NULL"
+    conn.execute(f"DELETE FROM {LEADERBOARD_TABLE}")
+    conn.execute(
+        f"INSERT INTO {LEADERBOARD_TABLE} (bucket, count) "
+        f"SELECT score / {HISTOGRAM_WIDTH}, COUNT(*) FROM ranking WHERE {valid} GROUP BY 1"
+    )
+    for table, key in (("ranking_daily_best", _DAY), ("ranking_weekly_best", _WEEK)):
+        period = key.format(row="ranking")
+        conn.execute(f"DELETE FROM {table}")
+        # 同点の場合はトリガーと同じく先に記録された行（id の小さい方）を最高点とする
+        conn.execute(f"""
+            INSERT INTO {table} (period, score, ranking_id, plays)
+            SELECT period, score, id, plays FROM (
+                SELECT {period} AS period, score, id,
+                       ROW_NUMBER() OVER (PARTITION BY {period} ORDER BY score DESC, id) AS position,
+                       COUNT(*) OVER (PARTITION BY {period}) AS plays
+                FROM ranking WHERE {valid}
+            ) WHERE position = 1
+        """)
+
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.replace("IF NOT EXISTS ", "").split())
+
+
+def _replace_outdated_trigger(conn: sqlite3.Connection, statement: str):
+    """
+    statement（CREATE TRIGGER IF NOT EXISTS ...）と定義の違う同名のトリガーがあれば作り直す
+    （IF NOT EXISTS だけでは、トリガーを直しても既存の DB には反映されないため）
+    """
+    name = statement.split()[5]
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+    if row is not None and _normalize_sql(row[0]) != _normalize_sql(statement):
+        conn.execute(f"DROP TRIGGER {name}")
+
+
+def _ensure_leaderboard(conn: sqlite3.Connection):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (LEADERBOARD_TABLE,)
+    ).fetchone()
+    for statement in LEADERBOARD_SCHEMA:
+        if statement.split()[1] == "TRIGGER":
+            _replace_outdated_trigger(conn, statement)
+        conn.execute(statement)
+    if not exists:
+        # 集計表を初めて作ったときは、それまでのランキングをまとめて登録する
+        rebuild_leaderboard(conn)
+
+
+class _PooledConnection:
+    def __init__(self, db_path: str):
+        self.lock = threading.RLock()
+        self.conn = open_connection(db_path)
+        ensure_schema(self.conn)
+
+
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pooled(db_path: str) -> _PooledConnection:
+    with _pool_lock:
+        pooled = _pool.get(db_path)
+        if pooled is None:
+            pooled = _PooledConnection(db_path)
+            _pool[db_path] = pooled
+        return pooled
+
+
+@contextmanager
+def transaction(db_path: str = DB_PATH):
+    """
+    db_path ごとに使い回される接続を取り出し、ブロックを 1 トランザクションとして実行する。
+    正常終了でコミット、例外発生時はロールバックする。
+
+        with transaction() as conn:
+            conn.execute("INSERT INTO scores (score, timestamp) VALUES (?, ?)", (score, ts))
+    """
+    pooled = _get_pooled(db_path)
+    with pooled.lock:
+        with pooled.conn:
+            yield pooled.conn
+
+
+def close_all():
+    """
+    プール中の接続をすべて閉じる（終了時に WAL の内容を本体へ反映させる）
+    """
+    with _pool_lock:
+        for pooled in _pool.values():
+            with pooled.lock:
+                pooled.conn.close()
+        _pool.clear()
+
+
+atexit.register(close_all)
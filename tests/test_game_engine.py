@@ -0,0 +1,53 @@
+"""
+game_engine.RoundState の確認（回答済みの問題に、後からの入力で結果が重ならないこと）
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_engine import (  # noqa: E402
+    GameState, RoundState, ANGRY_COIN_LIMIT, CORRECT, INITIAL_LIVES, TIMEOUT, TOO_MANY_COINS,
+)
+
+ORDER = [{"id": 1, "name": "からあげ", "price": 248, "qty": 2}]
+PAYMENT = 1000
+
+
+def _new_round():
+    return RoundState([item.copy() for item in ORDER], PAYMENT, GameState())
+
+
+def test_coin_taps_after_checkout_are_ignored():
+    round_state = _new_round()
+    round_state.cart_add(ORDER[0])
+    round_state.cart_add(ORDER[0])
+    for value in (500, 1, 1, 1, 1):
+        round_state.coin_tap(value)
+    assert round_state.checkout() == CORRECT
+    score = round_state.state.score
+
+    for _ in range(ANGRY_COIN_LIMIT + 5):
+        assert round_state.coin_tap(1) is None
+    assert round_state.outcome == CORRECT
+    assert (round_state.state.score, round_state.state.lives, round_state.state.rounds) == (score, INITIAL_LIVES, 1)
+
+
+def test_coin_taps_after_timeout_do_not_cost_another_life():
+    round_state = _new_round()
+    assert round_state.timeout() == TIMEOUT
+
+    for _ in range(ANGRY_COIN_LIMIT + 5):
+        assert round_state.coin_tap(1) is None
+    assert round_state.outcome == TIMEOUT
+    assert (round_state.state.lives, round_state.state.rounds) == (INITIAL_LIVES - 1, 1)
+
+
+def test_too_many_coins_finishes_the_round_once():
+    round_state = _new_round()
+    outcomes = [round_state.coin_tap(1) for _ in range(ANGRY_COIN_LIMIT + 5)]
+    assert outcomes.count(TOO_MANY_COINS) == 1
+    assert round_state.checkout() is None
+    assert round_state.timeout() is None
+    assert (round_state.state.lives, round_state.state.rounds) == (INITIAL_LIVES - 1, 1)
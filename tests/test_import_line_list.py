@@ -0,0 +1,71 @@
+"""
+import_line_list の件数の内訳の確認（商品検索の索引のトリガーによる書き込みを数えないこと）
+"""
+import os
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+from import_line_list import import_csv_to_db  # noqa: E402
+
+CSV_PATH = os.path.join(ROOT, "line_list.csv")
+
+
+def _import(csv_path, db_path):
+    return import_csv_to_db(csv_path, db_path, progress=None)
+
+
+def test_reimport_counts(tmp_path):
+    db_path = str(tmp_path / "import.db")
+    try:
+        first = _import(CSV_PATH, db_path)
+        assert first["rows"] > 0
+        assert (first["inserted"], first["updated"], first["unchanged"]) == (first["rows"], 0, 0)
+
+        second = _import(CSV_PATH, db_path)
+        assert (second["inserted"], second["updated"], second["unchanged"]) == (0, 0, second["rows"])
+    finally:
+        storage.close_all()
+
+
+def test_changed_price_counts_as_update(tmp_path):
+    db_path = str(tmp_path / "import.db")
+    csv_path = tmp_path / "line_list.csv"
+    shutil.copy(CSV_PATH, csv_path)
+    try:
+        first = _import(str(csv_path), db_path)
+        with open(csv_path, encoding="utf-8") as f:
+            header, row, *rest = f.read().splitlines()
+        name, price, genre, image = row.split(",")
+        csv_path.write_text("\n".join([header, f"{name},{int(price) + 1},{genre},{image}", *rest]) + "\n",
+                            encoding="utf-8")
+
+        second = _import(str(csv_path), db_path)
+        assert (second["inserted"], second["updated"], second["unchanged"]) == (0, 1, first["rows"] - 1)
+    finally:
+        storage.close_all()
+
+
+def test_prune_keeps_products_of_skipped_rows(tmp_path):
+    db_path = str(tmp_path / "import.db")
+    csv_path = tmp_path / "line_list.csv"
+    shutil.copy(CSV_PATH, csv_path)
+    try:
+        first = _import(str(csv_path), db_path)
+        with open(csv_path, encoding="utf-8") as f:
+            header, row, *rest = f.read().splitlines()
+        name, _, genre, image = row.split(",")
+        csv_path.write_text("\n".join([header, f"{name},12o,{genre},{image}", *rest]) + "\n", encoding="utf-8")
+
+        second = import_csv_to_db(str(csv_path), db_path, prune=True, progress=None)
+        assert (second["skipped"], second["deleted"]) == (1, 0)
+        with storage.transaction(db_path) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM line_list").fetchone()[0]
+            kept = conn.execute("SELECT 1 FROM line_list WHERE name = ?", (name,)).fetchone()
+        assert count == first["inserted"]
+        assert kept is not None
+    finally:
+        storage.close_all()
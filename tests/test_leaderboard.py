@@ -0,0 +1,60 @@
+"""
+ランキングの集計表（トリガーで更新）が、rebuild_leaderboard で作り直した結果と一致することの確認
+"""
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+
+TABLES = ("ranking_daily_best", "ranking_weekly_best", storage.LEADERBOARD_TABLE)
+
+
+def _open(tmp_path):
+    conn = storage.open_connection(str(tmp_path / "ranking.db"))
+    storage.ensure_schema(conn)
+    return conn
+
+
+def _snapshot(conn) -> dict:
+    return {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall() for table in TABLES}
+
+
+def _assert_matches_rebuild(conn):
+    by_trigger = _snapshot(conn)
+    with conn:
+        storage.rebuild_leaderboard(conn)
+    assert by_trigger == _snapshot(conn)
+
+
+def test_delete_only_row(tmp_path):
+    conn = _open(tmp_path)
+    try:
+        with conn:
+            conn.execute("INSERT INTO ranking (score, timestamp) VALUES (1200, '2025-01-01 10:00:00')")
+        with conn:
+            conn.execute("DELETE FROM ranking")
+        assert _snapshot(conn) == {table: [] for table in TABLES}
+        _assert_matches_rebuild(conn)
+    finally:
+        conn.close()
+
+
+def test_random_inserts_and_deletes(tmp_path):
+    rng = random.Random(0)
+    conn = _open(tmp_path)
+    try:
+        for _ in range(300):
+            ids = [row[0] for row in conn.execute("SELECT id FROM ranking")]
+            with conn:
+                if ids and rng.random() < 0.45:
+                    conn.execute("DELETE FROM ranking WHERE id = ?", (rng.choice(ids),))
+                else:
+                    conn.execute("INSERT INTO ranking (score, timestamp) VALUES (?, ?)",
+                                 (rng.randrange(0, 5000, 100), f"2025-01-{rng.randint(1, 20):02d} 12:00:00"))
+        _assert_matches_rebuild(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,37 @@
+import json
+import os
+import threading
+
+THUMBS_DIR = os.path.join("assets", "thumbs")
+MANIFEST_PATH = os.path.join(THUMBS_DIR, "manifest.json")
+
+# サムネイルの倍率（高解像度ディスプレイでもぼやけないよう 2x を使う）。
+# flet はクライアントの devicePixelRatio を渡してこないため、画面ごとに倍率を選ばず、build_assets.py もこの倍率だけを作る
+THUMBNAIL_SCALE = 2
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def _load_manifest() -> dict:
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            try:
+                with open(MANIFEST_PATH, encoding="utf-8") as f:
+                    _manifest = json.load(f)
+            except (OSError, ValueError):
+                # build_assets.py を実行していない場合は元画像をそのまま使う
+                _manifest = {}
+        return _manifest
+
+
+def thumbnail_src(image: str, size: int, scale: int = THUMBNAIL_SCALE) -> str:
+    """
+    商品画像 image を size × size で表示するときの src を返す。
+    manifest.json に該当するサムネイルが無ければ assets/images の元画像を返す。
+    """
+    variant = _load_manifest().get(image, {}).get(str(size), {}).get(str(scale))
+    if variant is not None:
+        return variant
+    return os.path.join("assets", "images", image).replace("\\", "/")
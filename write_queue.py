@@ -0,0 +1,179 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from score import current_timestamp
+from storage import DB_PATH, ensure_schema, open_connection
+
+_STOP = object()  # 書き込みスレッドを止めるための目印
+
+
+class WriteQueue:
+    """
+    ranking / scores への INSERT を 1 本の書き込みスレッドにまとめて行うキュー。
+    呼び出し側はキューに積むだけで待たず、書き込みが完了（コミット済み）したら Future に結果が入る。
+    書き込みスレッドは溜まっている分をまとめて 1 トランザクションでコミットする（グループコミット）。
+    専用の接続を synchronous=FULL で使うため、Future が完了した時点でディスクへの書き込みも済んでいる
+    （ディスクへの同期は 1 回のコミットにつき 1 回なので、まとめるほど 1 件あたりの負担は減る）。
+    """
+
+    def __init__(self, db_path: str = DB_PATH, max_batch: int = 500, max_delay: float = 0.02):
+        # max_delay: 最初の 1 件が届いてから、同じコミットにまとめる分を待つ時間 [秒]
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WriteQueue は既に閉じられています")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def submit(self, sql: str, params: tuple) -> Future:
+        """
+        SQL（INSERT など）をキューに積み、コミット後に完了する Future を返す（結果は None）
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((sql, params, future))
+        return future
+
+    def record_ranking(self, score: int) -> Future:
+        """
+        ゲーム終了時の最終スコアをランキングに記録する（score.record_ranking の非同期版）
+        """
+        return self.submit("INSERT INTO ranking (score, timestamp) VALUES (?, ?)", (score, current_timestamp()))
+
+    def record_score(self, score: int) -> Future:
+        """
+        スコアを記録する（score.record_score の非同期版）
+        """
+        return self.submit("INSERT INTO scores (score, timestamp) VALUES (?, ?)", (score, current_timestamp()))
+
+    def flush(self, timeout: float = None):
+        """
+        これまでに積んだ書き込みがすべてコミットされるまで待つ
+        """
+        if self._thread is None:
+            return
+        self.submit(None, None).result(timeout)
+
+    def close(self, timeout: float = None):
+        """
+        残っている書き込みをすべてコミットしてから書き込みスレッドを止める（終了時に呼ぶ）
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _next_batch(self, first) -> list:
+        batch = [first]
+        deadline = None
+        while len(batch) < self.max_batch:
+            try:
+                if deadline is None:
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                if deadline is not None or self.max_delay <= 0:
+                    break
+                # 既に溜まっている分を取り終えたら、同時に終わったゲームの分を少しだけ待ってまとめる
+                deadline = time.monotonic() + self.max_delay
+                continue
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        conn = open_connection(self.db_path)
+        conn.execute("PRAGMA synchronous=FULL")
+        ensure_schema(conn)
+        try:
+            while True:
+                batch = self._next_batch(self._queue.get())
+                stop = batch[-1] is _STOP
+                writes = [item for item in batch if item is not _STOP]
+                self._commit(conn, writes)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _commit(self, conn, writes: list):
+        statements = [item for item in writes if item[0] is not None]
+        try:
+            with conn:
+                for sql, params, _ in statements:
+                    conn.execute(sql, params)
+        except Exception:
+            # まとめたうちのどれかが失敗した場合は 1 件ずつ書き直し、失敗したものだけを Future に伝える
+            for sql, params, future in statements:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except Exception as ex:
+                    _resolve(future, exception=ex)
+                else:
+                    _resolve(future)
+        else:
+            for _, _, future in statements:
+                _resolve(future)
+        # flush() の目印は、それより前に積まれた書き込みがすべてコミットされてから完了させる
+        for sql, _, future in writes:
+            if sql is None:
+                _resolve(future)
+
+
+def _resolve(future: Future, exception: Exception = None):
+    if future.cancelled():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(None)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(db_path: str = DB_PATH) -> WriteQueue:
+    """
+    db_path ごとに共有される WriteQueue を返す
+    """
+    with _queues_lock:
+        write_queue = _queues.get(db_path)
+        if write_queue is None:
+            write_queue = WriteQueue(db_path)
+            _queues[db_path] = write_queue
+        return write_queue
+
+
+def close_all(timeout: float = 10.0):
+    """
+    すべてのキューの残りを書き込んでから止める（終了時に自動で呼ばれる）
+    """
+    with _queues_lock:
+        queues = list(_queues.values())
+        _queues.clear()
+    for write_queue in queues:
+        write_queue.close(timeout)
+
+
+# storage.close_all より後に登録するので、終了時には接続を閉じる前にこちらが先に実行される
+atexit.register(close_all)